@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'amnah_project.settings')
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', '1')
+# Async views run queries on short-lived worker threads, so connections are not kept
+# between requests (Django advises against persistent connections under ASGI).
+os.environ.setdefault('DJANGO_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
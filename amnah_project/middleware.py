@@ -0,0 +1,172 @@
+"""Per-request performance instrumentation.
+
+``PerformanceMiddleware`` measures every request's total time, SQL query count
+and time (through an execute wrapper that every connection gets when it is
+opened) and template render time
+(reported by ``amnah_project.template_backends.TimedDjangoTemplates``). The
+figures are sent back in a ``Server-Timing`` header, which browsers show in the
+network panel, and requests slower than ``PERF_SLOW_REQUEST_MS`` are written to
+the ``amnah_project.perf`` logger as one JSON object with their slowest queries.
+
+The request's timings live in a context variable, which asgiref copies into
+``sync_to_async`` threads, so queries an async view runs on worker threads (see
+core.asyncdb) are counted too. The middleware handles sync and async requests.
+
+The per-query cost is two ``perf_counter`` calls and, only for queries slower
+than the ones already kept, a heap push, so it can stay on in production.
+Streaming responses are timed up to the point the response is returned, not
+until the body has been sent.
+"""
+import heapq
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+logger = logging.getLogger("amnah_project.perf")
+
+_current = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    def __init__(self, keep_queries: int):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_query_seconds = 0.0
+        self.keep_queries = keep_queries
+        self._slowest = []  # min-heap of (seconds, sequence, sql)
+        self._lock = threading.Lock()  # async views may run queries on several threads at once
+
+    def add_query(self, sql: str, seconds: float) -> None:
+        with self._lock:
+            self._add_query(sql, seconds)
+
+    def _add_query(self, sql: str, seconds: float) -> None:
+        self.query_count += 1
+        self.query_seconds += seconds
+        if not self.keep_queries:
+            return
+        if len(self._slowest) < self.keep_queries:
+            heapq.heappush(self._slowest, (seconds, self.query_count, sql))
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (seconds, self.query_count, sql))
+
+    def slowest_queries(self) -> list:
+        return [
+            {"ms": round(seconds * 1000, 2), "sql": sql[:1000]}
+            for seconds, _, sql in sorted(self._slowest, reverse=True)
+        ]
+
+
+def current_timings():
+    """The RequestTimings of the request being handled, or None outside PerformanceMiddleware."""
+    return _current.get()
+
+
+def _record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(sql, time.perf_counter() - started)
+
+
+def _instrument(connection) -> None:
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _instrument_new_connection(sender, connection, **kwargs):
+    _instrument(connection)
+
+
+connection_created.connect(_instrument_new_connection, dispatch_uid="amnah_project.perf")
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, "PERF_SLOW_REQUEST_MS", 500)
+        self.keep_queries = getattr(settings, "PERF_LOG_SLOWEST_QUERIES", 5)
+        self.server_timing = getattr(settings, "PERF_SERVER_TIMING", True)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Connections opened before this module was imported missed connection_created.
+        for connection in connections.all(initialized_only=True):
+            _instrument(connection)
+        timings = RequestTimings(self.keep_queries)
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - timings.started
+        if self._finish(response, timings, total):
+            self._log_slow(request, response, timings, total)
+        return response
+
+    async def __acall__(self, request):
+        timings = RequestTimings(self.keep_queries)
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - timings.started
+        if self._finish(response, timings, total):
+            # Reading request.user may load the session from the database.
+            await sync_to_async(self._log_slow)(request, response, timings, total)
+        return response
+
+    def _finish(self, response, timings, total) -> bool:
+        """Add the Server-Timing header; return True when the request should be logged as slow."""
+        if self.server_timing:
+            response["Server-Timing"] = self._server_timing(timings, total)
+        return total * 1000 >= self.slow_ms
+
+    def _server_timing(self, timings, total) -> str:
+        # Template time includes the queries run while rendering (lazy querysets); app is the rest.
+        app = max(0.0, total - timings.query_seconds - timings.template_seconds + timings.template_query_seconds)
+        return ", ".join([
+            f'db;dur={timings.query_seconds * 1000:.1f};desc="{timings.query_count} queries"',
+            f"tpl;dur={timings.template_seconds * 1000:.1f}",
+            f"app;dur={app * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ])
+
+    def _log_slow(self, request, response, timings, total) -> None:
+        match = getattr(request, "resolver_match", None)
+        user = getattr(request, "user", None)
+        record = {
+            "event": "slow_request",
+            "method": request.method,
+            "path": request.get_full_path(),
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "user_id": user.pk if user is not None and user.is_authenticated else None,
+            "total_ms": round(total * 1000, 1),
+            "db_ms": round(timings.query_seconds * 1000, 1),
+            "queries": timings.query_count,
+            "template_ms": round(timings.template_seconds * 1000, 1),
+            "slowest_queries": timings.slowest_queries(),
+        }
+        logger.warning(json.dumps(record, ensure_ascii=False), extra={"perf": record})
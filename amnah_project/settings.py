@@ -45,11 +45,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'amnah_project.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.activity.ActivityLogMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -58,7 +60,8 @@ ROOT_URLCONF = 'amnah_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to PerformanceMiddleware.
+        'BACKEND': 'amnah_project.template_backends.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -73,18 +76,80 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'amnah_project.wsgi.application'
 
+# Serve the dashboard and its export with async views that run their queries
+# concurrently. amnah_project/asgi.py turns this on; under WSGI the sync views are used.
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '0') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite is tuned for concurrent requests: WAL lets readers run alongside the single
+# writer, IMMEDIATE transactions take the write lock up front (so two writers queue
+# on the busy timeout instead of failing with "database is locked" on upgrade), and
+# connections are kept open between requests. `manage.py bench_sqlite_concurrency`
+# compares this against SQLite's defaults.
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -20000,  # KiB, i.e. about 20 MB per connection
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('DJANGO_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': float(os.environ.get('SQLITE_BUSY_TIMEOUT', '20')),
+        },
     }
 }
 
 
+# Caches
+# The "dashboard" cache holds computed dashboard totals (core/resultcache.py).
+# DASHBOARD_CACHE_BACKEND selects "locmem" (per process, LRU), "file" or "db"
+# (shared between processes; run `manage.py createcachetable` for "db"), or
+# "none" to compute every result (used by benchmarks).
+
+DASHBOARD_CACHE_BACKEND = os.environ.get('DASHBOARD_CACHE_BACKEND', 'locmem')
+DASHBOARD_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'amnah-dashboard',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DASHBOARD_CACHE_DIR', str(BASE_DIR / 'cache' / 'dashboard')),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'core_dashboard_cache',
+    },
+    'none': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboard': {
+        **DASHBOARD_CACHE_BACKENDS[DASHBOARD_CACHE_BACKEND],
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('DASHBOARD_CACHE_MAX_ENTRIES', '500'))},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -114,6 +179,40 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Activity logging: "sync" writes each entry inside the view, "request" writes a
+# request's entries in one bulk insert after the response, "background" batches
+# them from a worker thread (see core/activity.py).
+ACTIVITY_LOG_MODE = os.environ.get('ACTIVITY_LOG_MODE', 'request')
+ACTIVITY_LOG_FLUSH_INTERVAL = float(os.environ.get('ACTIVITY_LOG_FLUSH_INTERVAL', '2'))
+ACTIVITY_LOG_BATCH_SIZE = 100
+
+# Background jobs (core/jobs.py, run by `manage.py run_jobs`): result files are
+# written to JOB_OUTPUT_DIR and deleted with their job JOB_RETENTION_HOURS after it
+# finishes; a running job whose worker has not reported for JOB_STALE_SECONDS is
+# queued again, at most JOB_MAX_ATTEMPTS times in all.
+JOB_OUTPUT_DIR = Path(os.environ.get('JOB_OUTPUT_DIR', BASE_DIR / 'job_output'))
+JOB_RETENTION_HOURS = float(os.environ.get('JOB_RETENTION_HOURS', '24'))
+JOB_STALE_SECONDS = 300
+JOB_MAX_ATTEMPTS = 3
+
+# Request instrumentation (amnah_project/middleware.py): every response gets a
+# Server-Timing header; requests slower than PERF_SLOW_REQUEST_MS are logged as
+# JSON to the "amnah_project.perf" logger with their slowest queries.
+PERF_SERVER_TIMING = True
+PERF_SLOW_REQUEST_MS = int(os.environ.get('PERF_SLOW_REQUEST_MS', '500'))
+PERF_LOG_SLOWEST_QUERIES = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'amnah_project.perf': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
 # Authentication redirects
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
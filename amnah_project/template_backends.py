@@ -0,0 +1,30 @@
+"""Django template backend that reports render time to PerformanceMiddleware."""
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from .middleware import current_timings
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = current_timings()
+        # Only the outermost render is timed; {% include %} runs inside it.
+        if timings is None or getattr(timings, "_rendering", False):
+            return super().render(context, request)
+        timings._rendering = True
+        started, queries_before = time.perf_counter(), timings.query_seconds
+        try:
+            return super().render(context, request)
+        finally:
+            timings._rendering = False
+            timings.template_seconds += time.perf_counter() - started
+            timings.template_query_seconds += timings.query_seconds - queries_before
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
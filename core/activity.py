@@ -0,0 +1,205 @@
+"""Activity logging with optional buffering.
+
+``settings.ACTIVITY_LOG_MODE`` selects how entries reach the database:
+
+* ``"sync"`` – one INSERT per call, inside the view (the original behaviour).
+* ``"request"`` – entries are collected on the request and written with a single
+  ``bulk_create`` by ``ActivityLogMiddleware`` when the response is closed, i.e.
+  after the server has sent it, so the client does not wait for the INSERT.
+* ``"background"`` – entries are queued to a worker thread that writes them in
+  batches every ``ACTIVITY_LOG_FLUSH_INTERVAL`` seconds (or ``ACTIVITY_LOG_BATCH_SIZE``
+  entries). The queue is drained at interpreter exit so a clean shutdown loses nothing.
+
+Timestamps are taken when the entry is logged, not when it is written.
+"""
+import atexit
+import logging
+import queue
+import threading
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import versioning
+from .models import ActivityLog, DataVersion
+
+
+logger = logging.getLogger(__name__)
+
+MODES = ("sync", "request", "background")
+
+
+def _mode() -> str:
+    mode = getattr(settings, "ACTIVITY_LOG_MODE", "sync")
+    return mode if mode in MODES else "sync"
+
+
+def write_entries(entries) -> None:
+    """Persist unsaved ActivityLog instances with one bulk INSERT, in one transaction with the version bump."""
+    entries = list(entries)
+    if entries:
+        with transaction.atomic():
+            ActivityLog.objects.bulk_create(entries)
+            versioning.bump(DataVersion.ACTIVITY)
+
+
+def build_entry(request, action: str, instance=None, *, model_name: str = None, object_id=None, object_repr: str = None, details: str = "") -> ActivityLog:
+    if instance is not None:
+        model_name = instance.__class__.__name__
+        object_id = getattr(instance, "pk", None)
+        object_repr = str(instance)
+    user = getattr(request, "user", None)
+    return ActivityLog(
+        timestamp=timezone.now(),
+        user=user if user is not None and user.is_authenticated else None,
+        action=action,
+        model_name=model_name or "",
+        object_id=object_id or 0,
+        object_repr=object_repr or "",
+        details=details or "",
+    )
+
+
+def log_activity(request, action: str, instance=None, *, model_name: str = None, object_id=None, object_repr: str = None, details: str = "") -> None:
+    entry = build_entry(request, action, instance, model_name=model_name, object_id=object_id, object_repr=object_repr, details=details)
+    log_entries(request, [entry])
+
+
+def log_entries(request, entries) -> None:
+    """Hand already-built entries to the configured mode."""
+    mode = _mode()
+    buffer = getattr(request, "_activity_log_buffer", None)
+    if mode == "request" and buffer is not None:
+        buffer.extend(entries)
+    elif mode == "background":
+        background_writer.enqueue(entries)
+    else:
+        write_entries(entries)
+
+
+def _flush_request(request) -> None:
+    entries, request._activity_log_buffer = request._activity_log_buffer, None
+    try:
+        write_entries(entries)
+    except Exception:
+        # HttpResponse.close() silently swallows errors from its closers.
+        logger.exception("Could not write %d activity log entries", len(entries))
+
+
+class ActivityLogMiddleware:
+    """Collects the request's activity entries and writes them in one bulk_create once the response is sent.
+
+    The write is registered as a closer of the response, which the WSGI/ASGI handler
+    runs after the last byte (and streamed content) has gone out. If no response is
+    produced, the entries are written straight away.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request._activity_log_buffer = []
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            _flush_request(request)
+            raise
+        response._resource_closers.append(lambda: _flush_request(request))
+        return response
+
+    async def __acall__(self, request):
+        request._activity_log_buffer = []
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            await sync_to_async(_flush_request)(request)
+            raise
+        # The ASGI handler closes the response through sync_to_async, on the thread that owns the connection.
+        response._resource_closers.append(lambda: _flush_request(request))
+        return response
+
+
+class BackgroundWriter:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def enqueue(self, entries) -> None:
+        for entry in entries:
+            self._queue.put(entry)
+        self._ensure_started()
+        if self._queue.qsize() >= getattr(settings, "ACTIVITY_LOG_BATCH_SIZE", 100):
+            self._wake.set()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+                self._thread.start()
+
+    def _drain(self) -> list:
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _write(self, batch) -> bool:
+        close_old_connections()
+        try:
+            write_entries(batch)
+            return True
+        except Exception:
+            logger.exception("Could not write %d activity log entries; will retry", len(batch))
+            return False
+        finally:
+            close_old_connections()
+
+    def _run(self) -> None:
+        interval = getattr(settings, "ACTIVITY_LOG_FLUSH_INTERVAL", 2.0)
+        batch_size = getattr(settings, "ACTIVITY_LOG_BATCH_SIZE", 100)
+        pending = []
+        while True:
+            self._wake.wait(interval)
+            self._wake.clear()
+            stopping = self._stopping.is_set()
+            pending.extend(self._drain())
+            while pending and self._write(pending[:batch_size]):
+                pending = pending[batch_size:]
+            if stopping:
+                if pending:
+                    logger.error("Dropped %d activity log entries at shutdown after write failures", len(pending))
+                return
+
+    def flush(self) -> None:
+        """Write everything queued so far from the calling thread."""
+        batch = self._drain()
+        if batch:
+            self._write(batch)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Drain the queue and stop the worker; registered with atexit."""
+        self._stopping.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        self.flush()
+
+
+background_writer = BackgroundWriter()
+atexit.register(background_writer.stop)
@@ -0,0 +1,206 @@
+"""JSON API for orders and partners.
+
+List endpoints accept the OrderFilterForm query parameters (orders only),
+``fields=`` to select columns (only those are fetched from the database),
+``limit=`` and keyset ``cursor=`` pagination. ``format=ndjson`` streams every
+matching row as newline-delimited JSON instead of returning one page.
+
+Writes take a JSON object body, are validated by OrderForm/PartnerForm and
+logged with log_activity. Authentication is the normal session login, so
+unsafe methods need the CSRF token like any other form post.
+"""
+import json
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.forms.models import model_to_dict
+from django.http import Http404, JsonResponse, HttpResponseNotAllowed, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+
+from . import changes
+from .activity import log_activity
+from .forms import OrderForm, OrderFilterForm, PartnerForm
+from .models import Order, Partner, ActivityLog
+from .pagination import paginate_keyset, InvalidCursor
+
+
+ORDER_FIELDS = ["id", "name", "order_type", "price", "date", "description", "customer_name", "customer_address", "signed_amount"]
+PARTNER_FIELDS = ["id", "name", "joined_amount", "percentage"]
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+MAX_CHANGES_LIMIT = 5000
+NDJSON_CHUNK_SIZE = 2000
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, payload):
+        super().__init__(payload)
+        self.status = status
+        self.payload = payload
+
+
+def _json(data, status: int = 200) -> JsonResponse:
+    return JsonResponse(data, status=status, json_dumps_params={"ensure_ascii": False})
+
+
+def api_view(methods):
+    """Session-authenticated JSON view: 401 instead of a login redirect, 405 for other methods."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return _json({"error": "authentication required"}, status=401)
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as exc:
+                return _json(exc.payload, status=exc.status)
+            except Http404:
+                return _json({"error": "not found"}, status=404)
+        return wrapper
+    return decorator
+
+
+def _fields(request, allowed) -> list:
+    raw = request.GET.get("fields")
+    if not raw:
+        return list(allowed)
+    fields = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ApiError(400, {"error": f"unknown field(s): {', '.join(unknown)}", "allowed": allowed})
+    return fields
+
+
+def _int_param(request, name: str, default: int) -> int:
+    try:
+        return int(request.GET.get(name) or default)
+    except ValueError:
+        raise ApiError(400, {"error": f"{name} must be an integer"})
+
+
+def _limit(request, maximum: int = MAX_LIMIT) -> int:
+    return max(1, min(_int_param(request, "limit", DEFAULT_LIMIT), maximum))
+
+
+def _body(request) -> dict:
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        raise ApiError(400, {"error": "body must be JSON"})
+    if not isinstance(data, dict):
+        raise ApiError(400, {"error": "body must be a JSON object"})
+    return data
+
+
+def _ndjson(rows, fields):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def _list(request, qs, fields, ordering):
+    """Return one keyset page of `qs`, or stream all of it as NDJSON."""
+    if request.GET.get("format") == "ndjson":
+        prefix = "-" if ordering.startswith("-") else ""
+        rows = qs.order_by(ordering, f"{prefix}pk").values_list(*fields).iterator(chunk_size=NDJSON_CHUNK_SIZE)
+        return StreamingHttpResponse(_ndjson(rows, fields), content_type="application/x-ndjson; charset=utf-8")
+
+    # The sort key and pk are fetched as well so the cursor can be built, then dropped.
+    sort_field = ordering.lstrip("-")
+    fetched = list(dict.fromkeys(fields + [sort_field, "id"]))
+    try:
+        page = paginate_keyset(qs.values(*fetched), ordering, _limit(request), cursor=request.GET.get("cursor"))
+    except InvalidCursor:
+        raise ApiError(400, {"error": "invalid cursor"})
+    results = [{name: row[name] for name in fields} for row in page]
+    return _json({"results": results, "next_cursor": page.next_cursor, "previous_cursor": page.previous_cursor})
+
+
+def _object(instance, fields) -> dict:
+    return {name: getattr(instance, name) for name in fields}
+
+
+def _save(request, form_class, instance, data, fields, action):
+    form = form_class(data, instance=instance)
+    if not form.is_valid():
+        raise ApiError(400, {"errors": form.errors.get_json_data()})
+    obj = form.save()
+    # An UPDATE does not read back database-generated columns such as Order.signed_amount.
+    generated = [field.attname for field in obj._meta.concrete_fields if field.generated]
+    if generated and action == ActivityLog.UPDATE:
+        obj.refresh_from_db(fields=generated)
+    log_activity(request, action, instance=obj)
+    return _json(_object(obj, fields), status=201 if action == ActivityLog.CREATE else 200)
+
+
+def _detail(request, instance, form_class, fields):
+    if request.method == "GET":
+        return _json(_object(instance, _fields(request, fields)))
+    if request.method == "DELETE":
+        log_activity(request, ActivityLog.DELETE, instance=instance)
+        instance.delete()
+        return _json({"deleted": True})
+    data = _body(request)
+    if request.method == "PATCH":
+        data = {**model_to_dict(instance, fields=form_class.Meta.fields), **data}
+    return _save(request, form_class, instance, data, fields, ActivityLog.UPDATE)
+
+
+@api_view(["GET", "POST"])
+def orders(request):
+    if request.method == "POST":
+        return _save(request, OrderForm, None, _body(request), ORDER_FIELDS, ActivityLog.CREATE)
+    fields = _fields(request, ORDER_FIELDS)
+    form = OrderFilterForm(request.GET)
+    if not form.is_valid():
+        raise ApiError(400, {"errors": form.errors.get_json_data()})
+    qs = form.filter_queryset(Order.objects.all())
+    return _list(request, qs, fields, form.ordering())
+
+
+@api_view(["GET", "PUT", "PATCH", "DELETE"])
+def order_detail(request, pk: int):
+    return _detail(request, get_object_or_404(Order, pk=pk), OrderForm, ORDER_FIELDS)
+
+
+@api_view(["GET", "POST"])
+def partners(request):
+    if request.method == "POST":
+        return _save(request, PartnerForm, None, _body(request), PARTNER_FIELDS, ActivityLog.CREATE)
+    return _list(request, Partner.objects.all(), _fields(request, PARTNER_FIELDS), "name")
+
+
+@api_view(["GET", "PUT", "PATCH", "DELETE"])
+def partner_detail(request, pk: int):
+    return _detail(request, get_object_or_404(Partner, pk=pk), PartnerForm, PARTNER_FIELDS)
+
+
+@api_view(["GET"])
+def change_feed(request):
+    """Order/Partner changes after sequence ``since``, oldest first, with the current row for non-deletes.
+
+    Clients store ``next_since`` and call again until ``has_more`` is false.
+    """
+    since = _int_param(request, "since", 0)
+    models = [name.strip() for name in (request.GET.get("models") or "").split(",") if name.strip()]
+    unknown = [name for name in models if name not in changes.FEED_MODELS]
+    if unknown:
+        raise ApiError(400, {"error": f"unknown model(s): {', '.join(unknown)}", "allowed": list(changes.FEED_MODELS)})
+    events, has_more = changes.changes_since(since, _limit(request, MAX_CHANGES_LIMIT), models)
+    current = changes.snapshots(events, {"order": ORDER_FIELDS, "partner": PARTNER_FIELDS})
+    return _json({
+        "changes": [
+            {
+                "seq": event.pk,
+                "model": event.model_name,
+                "id": event.object_id,
+                "action": event.action,
+                "timestamp": event.timestamp,
+                "data": current.get((event.model_name, event.object_id)),
+            }
+            for event in events
+        ],
+        "next_since": events[-1].pk if events else since,
+        "has_more": has_more,
+    })
@@ -0,0 +1,53 @@
+"""Run independent read queries concurrently from async views.
+
+Django's async ORM methods (``aaggregate``, ``aiterator`` ...) all hop to the
+same thread-sensitive executor, so awaiting several of them together still runs
+them one after another. ``gather`` runs each callable with
+``thread_sensitive=False`` instead: every call gets a thread from the default
+executor and that thread's own connection, so the queries overlap (SQLite in WAL
+mode serves concurrent readers). Worker connections are opened and retired like
+a request's, following CONN_MAX_AGE.
+
+An in-memory database (the test database) is private to its connection, so
+there the callables run one after another on the thread-sensitive executor.
+"""
+import asyncio
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+
+
+def _concurrent(using: str = DEFAULT_DB_ALIAS) -> bool:
+    connection = connections[using]
+    return not (connection.vendor == "sqlite" and connection.is_in_memory_db())
+
+
+def _on_worker(func):
+    def run():
+        close_old_connections()
+        try:
+            return func()
+        finally:
+            close_old_connections()
+    return run
+
+
+async def gather(*funcs, using: str = DEFAULT_DB_ALIAS) -> list:
+    """Call the read-only ORM callables `funcs` at the same time; return their results in order."""
+    if not _concurrent(using):
+        return [await sync_to_async(func)() for func in funcs]
+    return list(await asyncio.gather(*(sync_to_async(_on_worker(func), thread_sensitive=False)() for func in funcs)))
+
+
+async def aiterate(iterable, chunk_size: int):
+    """Iterate a lazy sync iterable (e.g. ``qs.iterator()``) from async code, one chunk per thread hop.
+
+    Unlike ``QuerySet.aiterator``, this also works for ``values_list()`` over a UNION,
+    whose iterable runs its query as soon as it is created.
+    """
+    iterator = iter(iterable)
+    next_chunk = sync_to_async(lambda: list(islice(iterator, chunk_size)))
+    while chunk := await next_chunk():
+        for item in chunk:
+            yield item
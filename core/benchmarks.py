@@ -0,0 +1,203 @@
+"""Synthetic data and view timings for ``manage.py bench_views``.
+
+``seed`` fills the database with orders whose types, dates and prices follow
+roughly what the live data looks like (Arabic names, more traffic on weekdays
+and in recent months, log-normal prices rounded to 250 IQD), plus activity log
+entries. ``run_scenarios`` requests each view with the test client and reports
+latency percentiles, query counts and peak Python memory.
+"""
+import datetime
+import math
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from . import customers, rollup
+from .models import Order, Partner, ActivityLog
+from .pagination import encode_cursor
+from .resultcache import CACHE_ALIAS
+
+
+FIRST_NAMES = ["محمد", "علي", "حسين", "أحمد", "فاطمة", "زينب", "مريم", "حسن", "عباس", "نور", "سارة", "كرار", "مصطفى", "هدى"]
+FAMILY_NAMES = ["الجبوري", "العبيدي", "الربيعي", "الساعدي", "التميمي", "الخفاجي", "الزبيدي", "الموسوي", "الحسيني", "العامري"]
+ITEMS = ["إسمنت", "حديد تسليح", "طابوق", "رمل", "كاشي", "أنابيب", "أسلاك كهرباء", "صبغ", "خشب", "زجاج", "ألمنيوم", "مولدة"]
+CITIES = ["بغداد - الكرادة", "بغداد - المنصور", "البصرة", "النجف", "كربلاء", "أربيل", "الموصل", "الحلة", "الكوت", "الناصرية"]
+
+# Share of orders per type; None is an order without a type.
+TYPE_WEIGHTS = [(Order.INGOING, 0.48), (Order.OUTGOING, 0.44), (None, 0.08)]
+# Friday is the quiet day.
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 1.0, 0.9, 0.25, 0.8]
+
+
+def _weighted_days(rng, start: datetime.date, days: int, count: int) -> list:
+    """`count` dates in [start, start + days), weighted towards recent days and away from Fridays."""
+    weights = [WEEKDAY_WEIGHTS[(start + datetime.timedelta(d)).weekday()] * (1 + 2 * d / days) for d in range(days)]
+    offsets = rng.choices(range(days), weights=weights, k=count)
+    return [start + datetime.timedelta(days=offset) for offset in offsets]
+
+
+def _price(rng) -> int:
+    # Median around 250,000 IQD with a long tail, in steps of 250.
+    return max(250, int(round(rng.lognormvariate(math.log(250_000), 1.1) / 250)) * 250)
+
+
+def seed(orders: int, years: int = 3, partners: int = 5, logs_per_order: float = 0.2, batch_size: int = 5000, rng_seed: int = 1, user=None, end: datetime.date = None) -> dict:
+    """Insert `orders` synthetic orders (plus partners and activity logs) and rebuild the rollup.
+
+    Orders are dated in the `years` up to `end` (today by default; tests pass a fixed day).
+    """
+    rng = random.Random(rng_seed)
+    end = end or datetime.date.today()
+    start = end - datetime.timedelta(days=365 * years)
+    days = (end - start).days + 1
+    types, type_weights = zip(*TYPE_WEIGHTS)
+
+    for i in range(partners):
+        Partner.objects.create(name=f"شريك {i + 1}", joined_amount=rng.randrange(10, 500) * 1_000_000, percentage=round(100 / partners, 2))
+
+    created = 0
+    while created < orders:
+        size = min(batch_size, orders - created)
+        dates = _weighted_days(rng, start, days, size)
+        order_types = rng.choices(types, weights=type_weights, k=size)
+        batch = []
+        for date, order_type in zip(dates, order_types):
+            customer = f"{rng.choice(FIRST_NAMES)} {rng.choice(FAMILY_NAMES)}"
+            batch.append(Order(
+                name=f"{rng.choice(ITEMS)} {rng.randrange(1, 500)}",
+                order_type=order_type,
+                price=_price(rng),
+                date=date,
+                description=rng.choice(["", "", f"دفعة {rng.randrange(1, 10)}"]),
+                customer_name=customer,
+                customer_address=rng.choice(CITIES),
+            ))
+        with transaction.atomic():
+            customers.link_all(batch)
+            Order.objects.bulk_create(batch)
+        created += size
+
+    log_count = int(orders * logs_per_order)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    actions = [ActivityLog.CREATE, ActivityLog.UPDATE, ActivityLog.DELETE]
+    for offset in range(0, log_count, batch_size):
+        size = min(batch_size, log_count - offset)
+        entries = [
+            ActivityLog(
+                timestamp=now - datetime.timedelta(seconds=rng.randrange(years * 365 * 86400)),
+                user=user,
+                action=rng.choices(actions, weights=[6, 3, 1])[0],
+                model_name="Order",
+                object_id=rng.randrange(1, orders + 1),
+                object_repr="",
+            )
+            for _ in range(size)
+        ]
+        with transaction.atomic():
+            ActivityLog.objects.bulk_create(entries)
+
+    # bulk_create sends no signals, so the rollup is built once at the end.
+    rollup.rebuild()
+    return {"orders": orders, "activity_logs": log_count, "partners": partners, "date_from": start, "date_to": end}
+
+
+def _cursor(value, pk, direction="next"):
+    return encode_cursor({"v": value, "pk": pk, "d": direction})
+
+
+def scenarios(date_from: datetime.date, date_to: datetime.date) -> list:
+    """(label, url, cold) for every view, filter and sort; cold scenarios clear the dashboard cache first."""
+    middle = date_from + (date_to - date_from) / 2
+    month_from, month_to = middle.isoformat(), (middle + datetime.timedelta(days=30)).isoformat()
+    year_from = (date_to - datetime.timedelta(days=365)).isoformat()
+    return [
+        ("dashboard", "/", True),
+        ("dashboard cached", "/", False),
+        ("dashboard month", f"/?date_from={month_from}&date_to={month_to}", True),
+        ("dashboard series month", f"/dashboard/series/?bucket=month&date_from={year_from}", False),
+        ("dashboard export month", f"/dashboard/export/?date_from={month_from}&date_to={month_to}", True),
+        ("dashboard export year", f"/dashboard/export/?date_from={year_from}", True),
+        ("orders", "/orders/", False),
+        ("orders type IN", "/orders/?order_type=IN", False),
+        ("orders date range", f"/orders/?date_from={month_from}&date_to={month_to}", False),
+        ("orders type + range", f"/orders/?order_type=OUT&date_from={month_from}&date_to={month_to}", False),
+        ("orders price range", "/orders/?price_min=100000&price_max=500000", False),
+        ("orders sort date", "/orders/?sort_by=date", False),
+        ("orders sort -date deep", "/orders/?sort_by=-date&cursor=" + _cursor(month_from, 1), False),
+        ("orders sort price", "/orders/?sort_by=price", False),
+        ("orders sort -price", "/orders/?sort_by=-price", False),
+        ("orders sort name", "/orders/?sort_by=name", False),
+        ("orders sort -name", "/orders/?sort_by=-name", False),
+        ("orders search", "/orders/?search=" + ITEMS[1], False),
+        ("orders customer search", "/orders/?customer_search=" + FAMILY_NAMES[0], False),
+        ("customers", "/customers/", False),
+        ("orders per_page 100", "/orders/?per_page=100", False),
+        ("logs", "/logs/", False),
+        ("logs by action", "/logs/?action=UPDATE", False),
+        ("logs by object", "/logs/?model_name=Order&object_id=7", False),
+        ("logs by time", f"/logs/?time_from={month_from}T00:00&time_to={month_to}T00:00", False),
+        ("partners statement", f"/partners/statement/?year={date_to.year}", True),
+    ]
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _request(client, url):
+    response = client.get(url)
+    if getattr(response, "streaming", False):
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def measure(client, url: str, repeat: int, cold: bool = False) -> dict:
+    """Time `repeat` requests of `url`; query count and peak memory come from one extra request."""
+    cache = caches[CACHE_ALIAS]
+    timings = []
+    status = None
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        started = time.perf_counter()
+        status = _request(client, url).status_code
+        timings.append((time.perf_counter() - started) * 1000)
+
+    if cold:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            _request(client, url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "url": url,
+        "status": status,
+        "repeat": repeat,
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(_percentile(timings, 0.95), 2),
+        "max_ms": round(max(timings), 2),
+        "queries": len(queries),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run_scenarios(client, scenario_list, repeat: int, only=None) -> dict:
+    results = {}
+    for label, url, cold in scenario_list:
+        if only and not any(name in label for name in only):
+            continue
+        _request(client, url)  # warm up templates and connection state
+        results[label] = measure(client, url, repeat, cold=cold)
+    return results
@@ -0,0 +1,70 @@
+"""Set-based bulk actions on orders.
+
+Each action is one UPDATE or DELETE over the selected primary keys. The daily
+rollup is adjusted with grouped queries before/after the statement, since
+``QuerySet.update`` sends no model signals and the per-row post_delete receiver
+is switched off around the delete, and the matching ActivityLog entries are
+written together with one bulk insert.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+
+from . import changes, orderarchive, rollup, versioning
+from .signals import deletes_accounted_for
+from .activity import build_entry, log_entries
+from .models import Order, ActivityLog, DataVersion, ChangeEvent
+
+
+def _entries(request, action, rows, details=""):
+    return [
+        build_entry(request, action, model_name="Order", object_id=row.pk, object_repr=str(row), details=details)
+        for row in rows
+    ]
+
+
+def _snapshot(qs):
+    """Load just the fields Order.__str__ needs, for the log entries."""
+    return list(qs.only("pk", "name", "order_type", "price", "date"))
+
+
+def bulk_delete(request, ids) -> int:
+    qs = Order.objects.filter(pk__in=ids)
+    with transaction.atomic():
+        rows = _snapshot(qs)
+        if not rows:
+            return 0
+        rollup.apply_queryset(qs, sign=-1)
+        # The rollup was adjusted for the whole set above; post_delete must not do it again per row.
+        with deletes_accounted_for():
+            qs.delete()
+        versioning.bump(DataVersion.ORDERS)
+        changes.record(Order, ChangeEvent.DELETE, [row.pk for row in rows])
+    log_entries(request, _entries(request, ActivityLog.DELETE, rows, details="bulk delete"))
+    return len(rows)
+
+
+def _bulk_update(request, ids, details, **values) -> int:
+    qs = Order.objects.filter(pk__in=ids)
+    with transaction.atomic():
+        rollup.apply_queryset(qs, sign=-1)
+        count = qs.update(**values)
+        if "date" in values:
+            # Raising here rolls the update back; archived years stay closed.
+            orderarchive.check_open(qs)
+        rollup.apply_queryset(qs, sign=1)
+        versioning.bump(DataVersion.ORDERS)
+        rows = _snapshot(qs)
+        changes.record(Order, ChangeEvent.UPDATE, [row.pk for row in rows])
+    log_entries(request, _entries(request, ActivityLog.UPDATE, rows, details=details))
+    return count
+
+
+def bulk_set_type(request, ids, order_type) -> int:
+    order_type = order_type or None
+    return _bulk_update(request, ids, f"bulk order_type={order_type or '-'}", order_type=order_type)
+
+
+def bulk_shift_date(request, ids, days: int) -> int:
+    return _bulk_update(request, ids, f"bulk date shift {days:+d} days", date=F("date") + timedelta(days=days))
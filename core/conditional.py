@@ -0,0 +1,78 @@
+"""Conditional GET support for pages derived from versioned data.
+
+``data_condition("order", ...)`` wraps a view with Django's ``condition``
+decorator. The ETag hashes the DataVersion counters the page depends on
+together with the full URL (so the filters), the user and the CSRF cookie;
+Last-Modified is the newest counter update. When the browser's validators
+still match, Django answers ``304 Not Modified`` after one small query and the
+view itself, with all of its page queries, never runs.
+
+Async views are supported: the user and the counters, which the synchronous
+ETag and Last-Modified callbacks read, are loaded before they run.
+
+A page with pending flash messages (django.contrib.messages) is always
+rendered, since the messages are not part of the validators.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.messages import get_messages
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from . import versioning
+
+
+def request_versions(request, names) -> dict:
+    """versioning.current(*names), loaded once per request and shared with the view."""
+    cache = getattr(request, "_data_versions", None)
+    if cache is None:
+        cache = request._data_versions = {}
+    key = tuple(names)
+    if key not in cache:
+        cache[key] = versioning.current(*names)
+    return cache[key]
+
+
+def _has_messages(request) -> bool:
+    # len() loads the pending messages without marking them as shown.
+    return len(get_messages(request)) > 0
+
+
+def data_condition(*names):
+    def etag(request, *args, **kwargs):
+        versions = request_versions(request, names)
+        parts = [f"{name}={version}" for name, (version, _) in sorted(versions.items())]
+        parts += [
+            request.get_full_path(),
+            f"user={getattr(request.user, 'pk', None)}",
+            request.COOKIES.get("csrftoken", ""),
+        ]
+        return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        times = [updated_at for _, updated_at in request_versions(request, names).values() if updated_at]
+        return max(times) if times else None
+
+    def decorator(view):
+        unconditional = cache_control(private=True, no_cache=True)(view)
+        conditional = cache_control(private=True, no_cache=True)(condition(etag_func=etag, last_modified_func=last_modified)(view))
+        if iscoroutinefunction(view):
+            async def async_conditional(request, *args, **kwargs):
+                if await sync_to_async(_has_messages)(request):
+                    return await unconditional(request, *args, **kwargs)
+                if hasattr(request, "auser"):
+                    # Reuses the user login_required already loaded instead of request.user's own lookup.
+                    request.user = await request.auser()
+                await sync_to_async(request_versions)(request, names)
+                return await conditional(request, *args, **kwargs)
+            return wraps(view)(async_conditional)
+
+        def sync_conditional(request, *args, **kwargs):
+            if _has_messages(request):
+                return unconditional(request, *args, **kwargs)
+            return conditional(request, *args, **kwargs)
+        return wraps(view)(sync_conditional)
+
+    return decorator
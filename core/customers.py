@@ -0,0 +1,109 @@
+"""Customers, deduplicated from the names typed on orders.
+
+``normalize_name`` folds the spelling differences that do not make a different
+customer (case, spacing, Arabic diacritics and tatweel, hamza forms of alef,
+taa marbuta and alef maqsura) into the key stored in Customer.key. Saving an
+order links it with ``link``; bulk inserts use ``link_all``, which resolves a
+whole batch with one lookup and one insert. A customer's address is the first
+one seen for them.
+
+``customer_totals`` reports per-customer totals with one grouped query over the
+covering order_customer_date_idx index.
+"""
+import re
+import unicodedata
+
+from django.db.models import Max, Q
+
+from .models import Order, ArchivedOrder, Customer
+from .stats import order_aggregates
+
+
+# Harakat, superscript alef and tatweel.
+_IGNORED = re.compile("[\u064b-\u065f\u0670\u0640]")
+_FOLDS = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ة": "ه"})
+
+SORTS = {
+    "-total_ingoing": ["-total_ingoing", "customer"],
+    "-num_orders": ["-num_orders", "customer"],
+    "-last_date": ["-last_date", "customer"],
+    "name": ["customer__name", "customer"],
+}
+
+
+def normalize_name(name: str) -> str:
+    name = unicodedata.normalize("NFKC", name or "")
+    name = _IGNORED.sub("", name).translate(_FOLDS).casefold()
+    return " ".join(name.split())[:255]
+
+
+def _display(name: str) -> str:
+    return " ".join(name.split())
+
+
+def link(order) -> None:
+    """Point `order.customer` at the customer for its customer_name, creating it if needed."""
+    key = normalize_name(order.customer_name)
+    if not key:
+        order.customer = None
+        return
+    address = (order.customer_address or "").strip()
+    customer, created = Customer.objects.get_or_create(key=key, defaults={"name": _display(order.customer_name), "address": address})
+    if not created and address and not customer.address:
+        Customer.objects.filter(pk=customer.pk).update(address=address)
+    order.customer = customer
+
+
+def link_all(orders) -> None:
+    """Set `customer_id` on unsaved orders before a bulk_create, with one lookup and one insert."""
+    keys = [normalize_name(order.customer_name) for order in orders]
+    first = {}
+    for key, order in zip(keys, orders):
+        if key and key not in first:
+            first[key] = order
+    ids = dict(Customer.objects.filter(key__in=first).values_list("key", "id"))
+    new = [
+        Customer(key=key, name=_display(order.customer_name), address=(order.customer_address or "").strip())
+        for key, order in first.items() if key not in ids
+    ]
+    if new:
+        # ignore_conflicts: a concurrent save may have created one of them meanwhile.
+        Customer.objects.bulk_create(new, ignore_conflicts=True)
+        ids.update(Customer.objects.filter(key__in=[customer.key for customer in new]).values_list("key", "id"))
+    for key, order in zip(keys, orders):
+        order.customer_id = ids.get(key)
+
+
+def matching(term: str, addresses: bool = True):
+    """Customers whose name contains `term` (compared normalized) or, unless `addresses` is false, whose address contains it."""
+    key = normalize_name(term)
+    condition = Q(key__contains=key) if key else Q(pk__in=[])
+    if addresses:
+        condition |= Q(address__icontains=term.strip())
+    return Customer.objects.filter(condition)
+
+
+def customer_totals(date_from=None, date_to=None, search: str = "", sort: str = "-total_ingoing", limit: int = 100, archive: bool = False) -> list:
+    """Per-customer order counts and totals (live or archived orders), best customers first.
+
+    One grouped query; rows carry ``customer``, ``customer__name``, ``last_date``,
+    every STAT_FIELDS value and ``total_profit``.
+    """
+    if sort not in SORTS:
+        raise ValueError(f"Unknown sort {sort!r}; expected one of {', '.join(SORTS)}")
+    qs = (ArchivedOrder if archive else Order).objects.filter(customer__isnull=False)
+    if date_from:
+        qs = qs.filter(date__gte=date_from)
+    if date_to:
+        qs = qs.filter(date__lte=date_to)
+    if search and search.strip():
+        qs = qs.filter(customer__in=matching(search))
+    rows = list(
+        qs.order_by()
+        .values("customer", "customer__name")
+        .annotate(**order_aggregates(), last_date=Max("date"))
+        .order_by(*SORTS[sort])[:limit]
+    )
+    for row in rows:
+        row["total_profit"] = row["total_ingoing"] - row["total_outgoing"]
+    return rows
@@ -0,0 +1,108 @@
+"""CSV export of the dashboard, produced row by row so it can be streamed (sync or async)."""
+import csv
+
+from .asyncdb import aiterate
+from .models import Order, ArchivedOrder
+from .resultcache import dashboard_summary, adashboard_summary
+
+
+EXPORT_CHUNK_SIZE = 2000
+TYPE_LABELS = dict(Order.TYPE_CHOICES)
+
+
+class Echo:
+    """File-like object whose write() hands the formatted line straight back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def _summary_rows(date_from, date_to, summary):
+    totals = summary["totals"]
+
+    # Summary section
+    yield ["Dashboard Statistics"]
+    yield ["Date From", date_from or "-"]
+    yield ["Date To", date_to or "-"]
+    yield ["Total Ingoing", totals["total_ingoing"]]
+    yield ["Total Outgoing", totals["total_outgoing"]]
+    yield ["Total Profit", totals["total_profit"]]
+    yield ["Orders Count", totals["num_orders"]]
+    yield ["Ingoing Count", totals["num_ingoing"]]
+    yield ["Outgoing Count", totals["num_outgoing"]]
+    yield ["Neutral Count", totals["num_neutral"]]
+    yield []
+
+    # Partner shares
+    yield ["Partner Shares (from profit)"]
+    yield ["Partner", "Percentage", "Share Amount"]
+    for row in summary["partner_rows"]:
+        partner = row["partner"]
+        yield [partner.name, f"{partner.percentage}%", row["share"]]
+    yield []
+
+    # Orders detail
+    yield ["Orders"]
+    yield ["Date", "Name", "Type", "Price", "Description"]
+
+
+def _order_rows(date_from, date_to):
+    """Live and archived orders in the range as (date, name, order_type, price, description), newest first."""
+    columns = ("date", "name", "order_type", "price", "description")
+    live = Order.objects.all()
+    archived = ArchivedOrder.objects.all()
+    if date_from:
+        live = live.filter(date__gte=date_from)
+        archived = archived.filter(date__gte=date_from)
+    if date_to:
+        live = live.filter(date__lte=date_to)
+        archived = archived.filter(date__lte=date_to)
+    return (
+        live.order_by().values_list(*columns)
+        .union(archived.order_by().values_list(*columns), all=True)
+        .order_by("-date", "name")
+    )
+
+
+def _order_row(values):
+    date, name, order_type, price, description = values
+    return [date, name, TYPE_LABELS.get(order_type, order_type), price, description]
+
+
+def dashboard_rows(date_from=None, date_to=None, chunk_size: int = EXPORT_CHUNK_SIZE, progress=None):
+    """Yield the rows of the dashboard export; orders are read in chunks as plain tuples.
+
+    Archived orders are listed with the live ones (one UNION ALL query), matching the totals above.
+    `progress`, if given, is called with the number of order rows yielded after every chunk.
+    """
+    yield from _summary_rows(date_from, date_to, dashboard_summary(date_from, date_to))
+    count = 0
+    for values in _order_rows(date_from, date_to).iterator(chunk_size=chunk_size):
+        yield _order_row(values)
+        count += 1
+        if progress is not None and count % chunk_size == 0:
+            progress(count)
+    if progress is not None:
+        progress(count)
+
+
+async def adashboard_rows(date_from=None, date_to=None, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """dashboard_rows() as an async generator, for streaming from an async view."""
+    for row in _summary_rows(date_from, date_to, await adashboard_summary(date_from, date_to)):
+        yield row
+    async for values in aiterate(_order_rows(date_from, date_to).iterator(chunk_size=chunk_size), chunk_size):
+        yield _order_row(values)
+
+
+def iter_csv(rows):
+    """Format rows as CSV lines one at a time."""
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+async def aiter_csv(rows):
+    """iter_csv() over an async iterable of rows."""
+    writer = csv.writer(Echo())
+    async for row in rows:
+        yield writer.writerow(row)
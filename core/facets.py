@@ -0,0 +1,121 @@
+"""Facet counts for the orders list: matches per order type, per month and per price bucket.
+
+When only dates and the order type are filtered (as for the unfiltered list),
+``rollup_facets`` answers the type and month facets from the DailyOrderStat
+rollup, so the cost grows with the number of days, not of orders. Prices are
+not in the rollup, and counting them would mean scanning every order, so that
+facet is left out there. When text, customer or price filters narrow the set,
+``order_facets`` counts the matching orders with one
+``GROUP BY order_type, month, price bucket`` query and sums each facet over
+the other two dimensions.
+
+Months are grouped on SQLite's native ``strftime('%Y-%m', date)``; TruncMonth
+calls back into Python for every row there. The order-type filter is applied
+while summing: the type facet shows what choosing each type would return,
+while the month and price facets count what the current filters match.
+"""
+import datetime
+
+from django.db import connection
+from django.db.models import Case, When, Value, Count, Sum, Func, CharField, IntegerField
+from django.db.models.functions import TruncMonth
+
+from .models import Order, DailyOrderStat
+
+
+# Lower bounds of the price buckets in IQD; the last bucket is open-ended.
+PRICE_BREAKS = [0, 100_000, 250_000, 500_000, 1_000_000]
+
+NEUTRAL = ""
+
+# Rollup field holding the count of each order type ("" for orders without one).
+TYPE_FIELDS = {Order.INGOING: "num_ingoing", Order.OUTGOING: "num_outgoing", NEUTRAL: "num_neutral"}
+
+
+def price_buckets() -> list:
+    """(lowest, highest or None) price of each bucket, inclusive like the price_min/price_max filters."""
+    uppers = [low - 1 for low in PRICE_BREAKS[1:]] + [None]
+    return list(zip(PRICE_BREAKS, uppers))
+
+
+def _bucket():
+    return Case(
+        *[When(price__lt=low, then=Value(i - 1)) for i, low in enumerate(PRICE_BREAKS) if i],
+        default=Value(len(PRICE_BREAKS) - 1),
+        output_field=IntegerField(),
+    )
+
+
+def _month_end(month: datetime.date) -> datetime.date:
+    following = (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return following - datetime.timedelta(days=1)
+
+
+def _month():
+    if connection.vendor == "sqlite":
+        return Func(Value("%Y-%m"), "date", function="strftime", output_field=CharField())
+    return TruncMonth("date")
+
+
+def _first_day(month) -> datetime.date:
+    if isinstance(month, str):
+        year, number = month.split("-")
+        return datetime.date(int(year), int(number), 1)
+    return month
+
+
+def _result(types, month_counts, prices) -> dict:
+    return {
+        "types": types,
+        "months": [(month, _month_end(month), count) for month, count in sorted(month_counts.items(), reverse=True) if count],
+        "prices": None if prices is None else [(low, high, count) for (low, high), count in zip(price_buckets(), prices)],
+        "total": sum(month_counts.values()),
+    }
+
+
+def rollup_facets(date_from=None, date_to=None, order_type: str = None, archive: bool = False) -> dict:
+    """Type and month facets of the live (or archived) orders in a date range, from the rollup.
+
+    Same shape as ``order_facets``, with "prices" set to None.
+    """
+    qs = DailyOrderStat.objects.filter(frozen=archive)
+    if date_from:
+        qs = qs.filter(date__gte=date_from)
+    if date_to:
+        qs = qs.filter(date__lte=date_to)
+    rows = qs.order_by().values(month=_month()).annotate(**{field: Sum(field) for field in TYPE_FIELDS.values()})
+    counted = [TYPE_FIELDS[order_type]] if order_type else list(TYPE_FIELDS.values())
+    types = {kind: 0 for kind in TYPE_FIELDS}
+    month_counts = {}
+    for row in rows:
+        for kind, field in TYPE_FIELDS.items():
+            types[kind] += row[field] or 0
+        month = _first_day(row["month"])
+        month_counts[month] = month_counts.get(month, 0) + sum(row[field] or 0 for field in counted)
+    return _result(types, month_counts, None)
+
+
+def order_facets(qs, order_type: str = None) -> dict:
+    """Count `qs` (every filter but the order type) per type, month and price bucket.
+
+    Returns {"types": {code: n}, "months": [(first day, last day, n)] newest first,
+    "prices": [(lowest, highest, n)], "total": n}; months and prices only count
+    orders of `order_type` when one is given. Neutral orders are counted under "".
+    """
+    rows = (
+        qs.order_by()
+        .values("order_type", month=_month(), bucket=_bucket())
+        .annotate(count=Count("id"))
+    )
+    types = {kind: 0 for kind in TYPE_FIELDS}
+    month_counts = {}
+    prices = [0] * len(PRICE_BREAKS)
+    for row in rows:
+        kind = row["order_type"] or NEUTRAL
+        types[kind] = types.get(kind, 0) + row["count"]
+        if order_type and kind != order_type:
+            continue
+        month = _first_day(row["month"])
+        month_counts[month] = month_counts.get(month, 0) + row["count"]
+        prices[row["bucket"]] += row["count"]
+    return _result(types, month_counts, prices)
@@ -0,0 +1,19 @@
+from django.db import models
+from django.db.models import Lookup
+
+
+class FullTextDocumentField(models.TextField):
+    """The hidden column of an SQLite FTS5 table that carries the table's own name.
+
+    Only useful for the ``match`` lookup, which renders ``<table>.<table> MATCH %s``.
+    """
+
+
+@FullTextDocumentField.register_lookup
+class Match(Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
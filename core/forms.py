@@ -1,5 +1,8 @@
 from django import forms
-from .models import Order, Partner
+from django.contrib.auth.models import User
+from .models import Order, Partner, ActivityLog
+from .search import search_orders
+from . import orderarchive
 
 
 class OrderForm(forms.ModelForm):
@@ -17,6 +20,66 @@ class OrderForm(forms.ModelForm):
             "customer_address": forms.TextInput(attrs={"class": "form-control", "placeholder": "عنوان الزبون"}),
         }
 
+    def __init__(self, *args, archived_years=None, **kwargs):
+        # Callers validating many rows (the CSV import) pass the archived years once.
+        super().__init__(*args, **kwargs)
+        self.archived_years = archived_years
+
+    def clean_date(self):
+        date = self.cleaned_data.get("date")
+        if date is None:
+            return date
+        if self.archived_years is None:
+            self.archived_years = orderarchive.archived_years()
+        if date.year in self.archived_years:
+            raise forms.ValidationError(f"سنة {date.year} مؤرشفة ولا يمكن إضافة طلبات إليها")
+        return date
+
+
+class OrderImportForm(forms.Form):
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={"class": "form-control", "accept": ".csv,text/csv"}))
+
+
+class IdListField(forms.Field):
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        if not value:
+            return []
+        try:
+            return sorted({int(v) for v in value})
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Invalid selection.")
+
+
+class OrderBulkActionForm(forms.Form):
+    DELETE = "delete"
+    SET_TYPE = "set_type"
+    SHIFT_DATE = "shift_date"
+
+    ids = IdListField(error_messages={"required": "اختر طلباً واحداً على الأقل"})
+    action = forms.ChoiceField(choices=[
+        (DELETE, "حذف"),
+        (SET_TYPE, "تغيير النوع"),
+        (SHIFT_DATE, "إزاحة التاريخ (أيام)"),
+    ], widget=forms.Select(attrs={
+        "class": "form-select form-select-sm",
+    }))
+    order_type = forms.ChoiceField(required=False, choices=[("", "غير محدد")] + Order.TYPE_CHOICES, widget=forms.Select(attrs={
+        "class": "form-select form-select-sm",
+    }))
+    days = forms.IntegerField(required=False, min_value=-3650, max_value=3650, widget=forms.NumberInput(attrs={
+        "class": "form-control form-control-sm",
+        "step": "1",
+        "placeholder": "± أيام",
+    }))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("action") == self.SHIFT_DATE and not cleaned_data.get("days"):
+            raise forms.ValidationError("أدخل عدد الأيام")
+        return cleaned_data
+
 
 class PartnerForm(forms.ModelForm):
     class Meta:
@@ -68,12 +131,15 @@ class OrderFilterForm(forms.Form):
         "placeholder": "Max",
     }))
     sort_by = forms.ChoiceField(required=False, choices=[
+        ("", "الأكثر صلة"),
         ("-date", "الأحدث أولاً"),
         ("date", "الأقدم أولاً"),
         ("-price", "الأعلى سعراً"),
         ("price", "الأقل سعراً"),
         ("name", "الاسم تصاعدي"),
         ("-name", "الاسم تنازلي"),
+        ("-signed_amount", "الأعلى ربحاً"),
+        ("signed_amount", "الأعلى صرفاً"),
     ], widget=forms.Select(attrs={
         "class": "form-select",
     }))
@@ -87,6 +153,62 @@ class OrderFilterForm(forms.Form):
         "class": "form-select",
     }))
 
+    archive = forms.BooleanField(required=False, widget=forms.CheckboxInput(attrs={
+        "class": "form-check-input",
+    }))
+
+    # Set by the links on the customers page. Larger ids do not fit a 64-bit SQLite integer.
+    customer = forms.IntegerField(required=False, min_value=1, max_value=2**63 - 1, widget=forms.HiddenInput())
+
+    # The filters that decide which orders match, i.e. the facet counts' cache signature.
+    FILTER_FIELDS = ["search", "customer_search", "customer", "order_type", "date_from", "date_to", "price_min", "price_max", "archive"]
+
+    def filter_queryset(self, qs):
+        """Apply the cleaned filters (not the sort) to an Order or ArchivedOrder queryset."""
+        qs = self.facet_queryset(qs)
+        if self.cleaned_data.get("order_type"):
+            qs = qs.filter(order_type=self.cleaned_data["order_type"])
+        return qs
+
+    def facet_queryset(self, qs):
+        """Every filter but the order type, which core.facets applies itself."""
+        data = self.cleaned_data
+        qs, self.search_ranked = search_orders(qs, data.get("search"), data.get("customer_search"))
+        if data.get("customer"):
+            qs = qs.filter(customer_id=data["customer"])
+        if data.get("date_from"):
+            qs = qs.filter(date__gte=data["date_from"])
+        if data.get("date_to"):
+            qs = qs.filter(date__lte=data["date_to"])
+        if data.get("price_min") is not None:
+            qs = qs.filter(price__gte=data["price_min"])
+        if data.get("price_max") is not None:
+            qs = qs.filter(price__lte=data["price_max"])
+        return qs
+
+    def filter_signature(self) -> dict:
+        return {name: self.cleaned_data.get(name) for name in self.FILTER_FIELDS}
+
+    def show_facets(self, facets) -> None:
+        """Put the facet counts next to the order type choices."""
+        types = facets["types"]
+        self.fields["order_type"].choices = [("", f"الكل ({sum(types.values())})")] + [
+            (code, f"{label} ({types.get(code, 0)})") for code, label in Order.TYPE_CHOICES
+        ]
+
+    def ordering(self) -> str:
+        """The chosen sort, or relevance when a full-text search ran without an explicit sort."""
+        sort_by = self.cleaned_data.get("sort_by")
+        if sort_by:
+            return sort_by
+        return "search_rank" if getattr(self, "search_ranked", False) else "-date"
+
+    def only_date_and_type_filters(self) -> bool:
+        """True when the filters can be answered from the daily rollup (no text or price filters)."""
+        data = self.cleaned_data
+        return not (data.get("search") or data.get("customer_search") or data.get("customer")
+                    or data.get("price_min") is not None or data.get("price_max") is not None)
+
 
 class DashboardFilterForm(forms.Form):
     date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={
@@ -105,3 +227,87 @@ class DashboardFilterForm(forms.Form):
         if date_from and date_to and date_from > date_to:
             raise forms.ValidationError("تاريخ البداية يجب أن يكون قبل تاريخ النهاية")
         return cleaned_data
+
+
+class CustomerFilterForm(DashboardFilterForm):
+    SORT_CHOICES = [
+        ("-total_ingoing", "الأعلى مبيعاً"),
+        ("-num_orders", "الأكثر طلبات"),
+        ("-last_date", "آخر طلب"),
+        ("name", "الاسم"),
+    ]
+
+    search = forms.CharField(required=False, widget=forms.TextInput(attrs={
+        "class": "form-control",
+        "placeholder": "بحث باسم الزبون أو العنوان",
+    }))
+    sort_by = forms.ChoiceField(required=False, choices=SORT_CHOICES, widget=forms.Select(attrs={
+        "class": "form-select",
+    }))
+    archive = forms.BooleanField(required=False, widget=forms.CheckboxInput(attrs={
+        "class": "form-check-input",
+    }))
+
+
+class PartnerStatementForm(forms.Form):
+    PERIOD_CHOICES = [
+        ("month", "شهري"),
+        ("quarter", "ربع سنوي"),
+        ("half", "نصف سنوي"),
+        ("year", "سنوي"),
+    ]
+
+    year = forms.IntegerField(min_value=1900, max_value=9999, widget=forms.NumberInput(attrs={
+        "class": "form-control",
+    }))
+    period = forms.ChoiceField(choices=PERIOD_CHOICES, initial="month", required=False, widget=forms.Select(attrs={
+        "class": "form-select",
+    }))
+
+
+class ActivityLogFilterForm(forms.Form):
+    user = forms.ModelChoiceField(required=False, queryset=User.objects.order_by("username"), empty_label="الكل", widget=forms.Select(attrs={
+        "class": "form-select",
+    }))
+    action = forms.ChoiceField(required=False, choices=[("", "الكل")] + ActivityLog.ACTION_CHOICES, widget=forms.Select(attrs={
+        "class": "form-select",
+    }))
+    model_name = forms.CharField(required=False, widget=forms.TextInput(attrs={
+        "class": "form-control",
+        "placeholder": "Order / Partner",
+    }))
+    object_id = forms.IntegerField(required=False, min_value=0, widget=forms.NumberInput(attrs={
+        "class": "form-control",
+        "step": "1",
+    }))
+    time_from = forms.DateTimeField(required=False, input_formats=["%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M", "%Y-%m-%d"], widget=forms.DateTimeInput(attrs={
+        "type": "datetime-local",
+        "class": "form-control",
+    }, format="%Y-%m-%dT%H:%M"))
+    time_to = forms.DateTimeField(required=False, input_formats=["%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M", "%Y-%m-%d"], widget=forms.DateTimeInput(attrs={
+        "type": "datetime-local",
+        "class": "form-control",
+    }, format="%Y-%m-%dT%H:%M"))
+    per_page = forms.ChoiceField(required=False, choices=[
+        ("25", "25"),
+        ("50", "50"),
+        ("100", "100"),
+    ], initial="50", widget=forms.Select(attrs={
+        "class": "form-select",
+    }))
+
+    def filter_queryset(self, qs):
+        data = self.cleaned_data
+        if data.get("user"):
+            qs = qs.filter(user=data["user"])
+        if data.get("action"):
+            qs = qs.filter(action=data["action"])
+        if data.get("model_name"):
+            qs = qs.filter(model_name=data["model_name"])
+        if data.get("object_id") is not None:
+            qs = qs.filter(object_id=data["object_id"])
+        if data.get("time_from"):
+            qs = qs.filter(timestamp__gte=data["time_from"])
+        if data.get("time_to"):
+            qs = qs.filter(timestamp__lte=data["time_to"])
+        return qs
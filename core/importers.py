@@ -0,0 +1,108 @@
+"""Bulk import of orders from CSV.
+
+Rows are read one at a time, validated with OrderForm and inserted with
+bulk_create in batches, each batch in its own transaction together with its
+customers and rollup update. One ActivityLog entry summarises the whole import.
+"""
+import csv
+
+from django.db import transaction
+
+from . import changes, customers, orderarchive, rollup, versioning
+from .activity import log_activity
+from .forms import OrderForm
+from .models import Order, ActivityLog, DataVersion, ChangeEvent
+
+
+IMPORT_COLUMNS = ["name", "order_type", "price", "date", "description", "customer_name", "customer_address"]
+REQUIRED_COLUMNS = ["name", "price", "date"]
+MAX_REPORTED_ERRORS = 1000
+
+# Accept the labels written by dashboard_export as well as the stored codes.
+TYPE_ALIASES = {label.lower(): code for code, label in Order.TYPE_CHOICES} | {code.lower(): code for code, _ in Order.TYPE_CHOICES}
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.rejected = 0
+        self.errors = []  # (line number, message), capped at MAX_REPORTED_ERRORS
+
+    def add_error(self, line: int, message: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def summary(self) -> str:
+        return f"{self.created} orders imported, {self.rejected} rows rejected"
+
+
+def _row_data(row: dict) -> dict:
+    data = {column: (row.get(column) or "").strip() for column in IMPORT_COLUMNS}
+    data["order_type"] = TYPE_ALIASES.get(data["order_type"].lower(), data["order_type"])
+    data["price"] = data["price"].replace(",", "")
+    return data
+
+
+def _form_errors(form) -> str:
+    return "; ".join(f"{field}: {' '.join(messages)}" for field, messages in form.errors.items())
+
+
+def _insert(batch, result: ImportResult) -> None:
+    with transaction.atomic():
+        customers.link_all(batch)
+        Order.objects.bulk_create(batch)
+        rollup.apply_orders(batch)
+        versioning.bump(DataVersion.ORDERS)
+        changes.record(Order, ChangeEvent.CREATE, [order.pk for order in batch])
+    result.created += len(batch)
+
+
+def import_orders(stream, batch_size: int = 500) -> ImportResult:
+    """Import orders from a text stream of CSV with a header row. Returns an ImportResult."""
+    result = ImportResult()
+    reader = csv.DictReader(stream)
+    try:
+        # Reading the header decodes the first chunk of the file, which may hold later rows too.
+        header = [(name or "").strip() for name in (reader.fieldnames or [])]
+    except (UnicodeDecodeError, csv.Error) as exc:
+        result.add_error(1, f"unreadable file: {exc}")
+        return result
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        result.add_error(1, f"missing column(s): {', '.join(missing)}")
+        return result
+    reader.fieldnames = header
+
+    batch = []
+    closed = orderarchive.archived_years()
+    try:
+        for row in reader:
+            form = OrderForm(_row_data(row), archived_years=closed)
+            if form.is_valid():
+                batch.append(form.save(commit=False))
+            else:
+                result.add_error(reader.line_num, _form_errors(form))
+            if len(batch) >= batch_size:
+                _insert(batch, result)
+                batch = []
+    except (UnicodeDecodeError, csv.Error) as exc:
+        result.add_error(reader.line_num, f"unreadable file: {exc}")
+    if batch:
+        _insert(batch, result)
+    return result
+
+
+def import_orders_logged(request, stream, source: str, batch_size: int = 500) -> ImportResult:
+    """Run import_orders and record one ActivityLog entry for the whole import."""
+    result = import_orders(stream, batch_size=batch_size)
+    if result.created:
+        log_activity(
+            request,
+            ActivityLog.CREATE,
+            model_name="Order",
+            object_id=0,
+            object_repr=f"CSV import from {source}",
+            details=result.summary(),
+        )
+    return result
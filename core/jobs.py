@@ -0,0 +1,138 @@
+"""A small database-backed job queue for work too long for a request.
+
+Views enqueue a Job; ``manage.py run_jobs`` workers claim and run them. A job is
+claimed with a conditional UPDATE (``WHERE id = ? AND status = 'queued'``), so
+when several workers race for the same row exactly one update matches and the
+others move on to the next job. A running job refreshes ``heartbeat_at`` with its
+progress; one whose worker died stops doing so and is queued again (up to
+``JOB_MAX_ATTEMPTS``). Finished jobs and their files are deleted after
+``JOB_RETENTION_HOURS`` by the workers.
+
+Handlers are registered in ``HANDLERS`` by kind and receive the job and a
+``report(done, total=None)`` callback; they return (path, download name).
+"""
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .exports import dashboard_rows, iter_csv
+from .models import Job
+from .resultcache import dashboard_summary
+
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_EXPORT = "dashboard_export"
+
+
+def output_dir() -> str:
+    path = str(settings.JOB_OUTPUT_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def default_worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(kind: str, params: dict = None, user=None) -> Job:
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}; expected one of {', '.join(HANDLERS)}")
+    return Job.objects.create(kind=kind, params=params or {}, user=user)
+
+
+def claim(worker: str):
+    """Mark the oldest queued job as running for `worker` and return it, or None if the queue is empty."""
+    while True:
+        pk = Job.objects.filter(status=Job.QUEUED).order_by("id").values_list("pk", flat=True).first()
+        if pk is None:
+            return None
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker, started_at=now, heartbeat_at=now, attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+        # Another worker took it between the SELECT and the UPDATE; try the next one.
+
+
+def _reporter(job):
+    def report(done: int, total: int = None) -> None:
+        values = {"progress": done, "heartbeat_at": timezone.now()}
+        if total is not None:
+            values["total"] = total
+        # Only while this worker still owns the job, in case it was requeued as stale.
+        Job.objects.filter(pk=job.pk, status=Job.RUNNING, worker=job.worker).update(**values)
+        job.progress = done
+    return report
+
+
+def run(job: Job) -> Job:
+    """Run a claimed job and record its outcome."""
+    try:
+        path, name = HANDLERS[job.kind](job, _reporter(job))
+    except Exception:
+        logger.exception("Job %s failed", job.pk)
+        Job.objects.filter(pk=job.pk, worker=job.worker).update(
+            status=Job.FAILED, error=traceback.format_exc(limit=5), finished_at=timezone.now(),
+        )
+    else:
+        Job.objects.filter(pk=job.pk, worker=job.worker).update(
+            status=Job.DONE, result_path=path, result_name=name, finished_at=timezone.now(),
+        )
+    job.refresh_from_db()
+    return job
+
+
+def requeue_stale(stale_after: float = None, max_attempts: int = None) -> int:
+    """Queue again (or fail, after max_attempts) running jobs whose worker stopped reporting."""
+    stale_after = settings.JOB_STALE_SECONDS if stale_after is None else stale_after
+    max_attempts = settings.JOB_MAX_ATTEMPTS if max_attempts is None else max_attempts
+    stale = Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=timezone.now() - timedelta(seconds=stale_after))
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=Job.FAILED, error="worker stopped responding", finished_at=timezone.now(),
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(status=Job.QUEUED, worker="", progress=0)
+    return failed + requeued
+
+
+def cleanup(retention_hours: float = None) -> int:
+    """Delete finished jobs older than the retention period, with their files. Returns the number deleted."""
+    retention_hours = settings.JOB_RETENTION_HOURS if retention_hours is None else retention_hours
+    cutoff = timezone.now() - timedelta(hours=retention_hours)
+    old = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished_at__lt=cutoff)
+    for path in old.exclude(result_path="").values_list("result_path", flat=True):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    deleted, _ = old.delete()
+    return deleted
+
+
+def run_dashboard_export(job: Job, report) -> tuple:
+    """Write the dashboard export CSV to disk, reporting progress every EXPORT_CHUNK_SIZE orders."""
+    date_from, date_to = job.params.get("date_from"), job.params.get("date_to")
+    report(0, dashboard_summary(date_from, date_to)["totals"]["num_orders"])
+    path = os.path.join(output_dir(), f"job-{job.pk}-dashboard_stats.csv")
+    partial = path + ".part"
+    try:
+        with open(partial, "w", encoding="utf-8", newline="") as fh:
+            fh.writelines(iter_csv(dashboard_rows(date_from, date_to, progress=report)))
+    except BaseException:
+        os.remove(partial)
+        raise
+    # Renamed only once complete, so a download never sees half a file.
+    os.replace(partial, path)
+    return path, "dashboard_stats.csv"
+
+
+HANDLERS = {
+    DASHBOARD_EXPORT: run_dashboard_export,
+}
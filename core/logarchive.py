@@ -0,0 +1,65 @@
+"""Retention for ActivityLog: move old rows out of the live table in id-ordered batches."""
+import gzip
+import io
+import json
+import os
+import zlib
+
+from django.db import transaction
+
+from . import versioning
+from .models import ActivityLog, ActivityLogArchive, DataVersion
+
+
+LOG_FIELDS = ["id", "timestamp", "user_id", "action", "model_name", "object_id", "object_repr", "details"]
+
+
+def _serialize(row: dict) -> str:
+    return json.dumps(row, ensure_ascii=False, default=str, separators=(",", ":"))
+
+
+def archive_logs(before, batch_size: int = 5000, path: str = None) -> int:
+    """Move entries older than `before` into ActivityLogArchive (or a gzip JSON-lines file at `path`).
+
+    Each batch is written and deleted in one transaction, so an interrupted run
+    loses nothing and can simply be started again. In file mode a batch is synced
+    to disk before its rows are deleted; if the delete then fails, the next run
+    writes that batch again. Returns the number of entries moved.
+    """
+    moved = 0
+    raw = out = None
+    if path:
+        raw = open(path, "ab")
+        out = io.TextIOWrapper(gzip.GzipFile(fileobj=raw, mode="ab"), encoding="utf-8")
+    try:
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    ActivityLog.objects.filter(timestamp__lt=before).order_by("id").values(*LOG_FIELDS)[:batch_size]
+                )
+                if not rows:
+                    break
+                lines = [_serialize(row) for row in rows]
+                if out is not None:
+                    out.write("\n".join(lines) + "\n")
+                    # GzipFile.flush() ends the deflate block, so everything so far can be decompressed.
+                    out.flush()
+                    raw.flush()
+                    os.fsync(raw.fileno())
+                else:
+                    ActivityLogArchive.objects.create(
+                        first_id=rows[0]["id"],
+                        last_id=rows[-1]["id"],
+                        first_timestamp=min(row["timestamp"] for row in rows),
+                        last_timestamp=max(row["timestamp"] for row in rows),
+                        count=len(rows),
+                        data=zlib.compress("\n".join(lines).encode("utf-8"), 9),
+                    )
+                ActivityLog.objects.filter(id__in=[row["id"] for row in rows]).delete()
+                versioning.bump(DataVersion.ACTIVITY)
+            moved += len(rows)
+    finally:
+        if out is not None:
+            out.close()
+            raw.close()
+    return moved
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.logarchive import archive_logs
+
+
+class Command(BaseCommand):
+    help = "Move activity log entries older than --days into the compressed archive table (or a gzip JSON-lines file)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=365, help="Keep this many days of entries in the live table (default 365).")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--file", help="Append to this .jsonl.gz file instead of the archive table.")
+
+    def handle(self, *args, **options):
+        if options["days"] < 0 or options["batch_size"] < 1:
+            raise CommandError("--days must be >= 0 and --batch-size >= 1.")
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        moved = archive_logs(cutoff, batch_size=options["batch_size"], path=options["file"])
+        target = options["file"] or "the archive table"
+        self.stdout.write(self.style.SUCCESS(f"Moved {moved} entries older than {cutoff:%Y-%m-%d} to {target}."))
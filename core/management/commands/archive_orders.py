@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import Order
+from core.orderarchive import ClosedYearError, archive_year, archived_years
+
+
+class Command(BaseCommand):
+    help = "Move the orders of closed years into the archive table and freeze their totals."
+
+    def add_arguments(self, parser):
+        parser.add_argument("years", nargs="*", type=int, help="Years to archive (default: every year before --keep-years).")
+        parser.add_argument("--keep-years", type=int, default=2, help="Keep the current year and this many minus one before it live (default 2).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options["keep_years"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--keep-years and --batch-size must be >= 1.")
+        years = options["years"]
+        if not years:
+            first_live = timezone.localdate().year - options["keep_years"] + 1
+            done = archived_years()
+            years = [d.year for d in Order.objects.filter(date__year__lt=first_live).dates("date", "year") if d.year not in done]
+        if not years:
+            self.stdout.write("Nothing to archive.")
+            return
+        for year in sorted(years):
+            try:
+                moved = archive_year(year, batch_size=options["batch_size"])
+            except ClosedYearError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(self.style.SUCCESS(f"Archived {moved} orders of {year}."))
@@ -0,0 +1,195 @@
+import http.client
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+
+from core.benchmarks import seed
+
+
+# (label, extra environment, ASGI?) — asgi-sync isolates the server from the async views.
+PROFILES = [
+    ("wsgi", {}, False),
+    ("asgi-sync", {"DJANGO_ASYNC_VIEWS": "0"}, True),
+    ("asgi", {}, True),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway SQLite file, serve it with runserver (WSGI) and uvicorn (ASGI, with the "
+        "sync and the async dashboard views) and report requests/s and latency of the dashboard "
+        "and its export for several numbers of concurrent users."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=20_000)
+        parser.add_argument("--users", default="1,8,32", help="Comma-separated numbers of concurrent users.")
+        parser.add_argument("--seconds", type=float, default=5.0, help="Load duration per profile and user count.")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--profile", action="append", default=[], help="Only run these profiles (wsgi, asgi-sync, asgi).")
+        parser.add_argument("--output", help="Also write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("bench_asgi needs the SQLite backend.")
+        if importlib.util.find_spec("uvicorn") is None:
+            raise CommandError("bench_asgi needs an ASGI server: pip install uvicorn")
+        try:
+            users = [int(n) for n in options["users"].split(",")]
+        except ValueError:
+            raise CommandError("--users must be a comma-separated list of integers.")
+        if options["orders"] < 1 or options["seconds"] <= 0 or min(users) < 1:
+            raise CommandError("--orders, --seconds and --users must be positive.")
+        profiles = [p for p in PROFILES if not options["profile"] or p[0] in options["profile"]]
+
+        handle, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        os.unlink(path)
+        settings_dict = connection.settings_dict
+        saved = settings_dict.get("TEST")
+        settings_dict["TEST"] = {**(saved or {}), "NAME": path}
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.stderr.write(f"Seeding {options['orders']} orders...")
+            user = User.objects.create_user("bench-asgi")
+            dataset = seed(options["orders"], user=user)
+            client = Client()
+            client.force_login(user)
+            cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+            connection.close()
+
+            results = {}
+            for label, env, asgi in profiles:
+                results[label] = self._run_profile(path, env, asgi, options["port"], cookie, dataset, users, options["seconds"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            settings_dict["TEST"] = saved
+            for suffix in ("", "-wal", "-shm", "-journal"):
+                if os.path.exists(path + suffix):
+                    os.unlink(path + suffix)
+
+        self._print(results)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                json.dump({"orders": options["orders"], "results": results}, fh, indent=2)
+            self.stderr.write(f"Report written to {options['output']}")
+
+    def _run_profile(self, path, env, asgi, port, cookie, dataset, users, seconds):
+        env = {
+            **os.environ,
+            "DJANGO_SQLITE_PATH": path,
+            # Every request computes its totals, and slow requests are not logged to the console.
+            "DASHBOARD_CACHE_BACKEND": "none",
+            "PERF_SLOW_REQUEST_MS": "1000000",
+            **env,
+        }
+        if asgi:
+            command = [sys.executable, "-m", "uvicorn", "amnah_project.asgi:application",
+                       "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log"]
+        else:
+            command = [sys.executable, "manage.py", "runserver", f"127.0.0.1:{port}", "--noreload", "--skip-checks"]
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            self._wait_until_up(port, server)
+            urls = self._urls(dataset)
+            return {str(n): self._load(port, cookie, urls, n, seconds) for n in users}
+        finally:
+            server.terminate()
+            server.wait(10)
+
+    def _urls(self, dataset):
+        # One dashboard and one export URL per month, so the aggregates really run on every request.
+        start, end = dataset["date_from"], dataset["date_to"]
+        year, month = start.year, start.month
+        urls = []
+        while (year, month) <= (end.year, end.month):
+            query = f"date_from={year}-{month:02d}-01&date_to={year}-{month:02d}-28"
+            urls += [f"/?{query}", f"/dashboard/export/?{query}"]
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return urls
+
+    def _wait_until_up(self, port, server, timeout=30.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"The server exited with status {server.returncode}.")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                conn.request("GET", "/login/")
+                conn.getresponse().read()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"The server did not answer on port {port} within {timeout:.0f}s.")
+
+    def _load(self, port, cookie, urls, users, seconds):
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+        barrier = threading.Barrier(users + 1)
+        stop_at = [0.0]
+
+        def worker(number):
+            mine, failed = [], 0
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            barrier.wait()
+            i = number
+            while time.monotonic() < stop_at[0]:
+                url = urls[i % len(urls)]
+                i += users
+                started = time.perf_counter()
+                try:
+                    conn.request("GET", url, headers={"Cookie": cookie})
+                    response = conn.getresponse()
+                    response.read()
+                    if response.status != 200:
+                        failed += 1
+                        continue
+                except (OSError, http.client.HTTPException):
+                    failed += 1
+                    conn.close()
+                    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                    continue
+                mine.append(time.perf_counter() - started)
+            conn.close()
+            with lock:
+                latencies.extend(mine)
+                errors[0] += failed
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(users)]
+        for thread in threads:
+            thread.start()
+        stop_at[0] = time.monotonic() + seconds
+        started = time.perf_counter()
+        barrier.wait()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            "requests": len(latencies),
+            "errors": errors[0],
+            "requests_per_second": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+            "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1) if latencies else None,
+        }
+
+    def _print(self, results):
+        self.stdout.write(f"{'profile':10} {'users':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+        for label, by_users in results.items():
+            for users, row in by_users.items():
+                self.stdout.write(
+                    f"{label:10} {users:>5} {row['requests_per_second']:8.1f} "
+                    f"{row['p50_ms'] or 0:8.1f} {row['p95_ms'] or 0:8.1f} {row['errors']:6d}"
+                )
@@ -0,0 +1,112 @@
+import datetime
+import os
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.activity import write_entries
+from core.models import Order, ActivityLog
+from core.stats import order_stats
+
+
+# SQLite's own defaults: rollback journal, FULL sync, DEFERRED transactions, 5 s busy timeout.
+DEFAULT_OPTIONS = {
+    "init_command": "PRAGMA journal_mode=DELETE;PRAGMA synchronous=FULL",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent order writes (with their rollup, version, change feed and activity log "
+        "writes) plus dashboard reads against a throwaway SQLite file, once with SQLite's defaults "
+        "and once with the tuned settings.DATABASES options, and report throughput and lock errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--ops", type=int, default=100, help="Operations per thread.")
+        parser.add_argument("--read-ratio", type=float, default=0.5, help="Share of operations that are dashboard reads.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("bench_sqlite_concurrency needs the SQLite backend.")
+        tuned = dict(connection.settings_dict.get("OPTIONS") or {})
+        profiles = [("default", DEFAULT_OPTIONS), ("tuned", tuned)]
+
+        setup_test_environment()
+        try:
+            for label, db_options in profiles:
+                result = self._run_profile(db_options, options["threads"], options["ops"], options["read_ratio"])
+                self.stdout.write(
+                    f"{label:8} {result['ok']:6d} ops in {result['seconds']:.2f}s "
+                    f"= {result['ok'] / result['seconds']:8.1f} ops/s, {result['errors']} lock errors"
+                )
+        finally:
+            teardown_test_environment()
+
+    def _run_profile(self, db_options, threads, ops, read_ratio):
+        handle, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        os.unlink(path)
+        settings_dict = connection.settings_dict
+        saved = settings_dict.get("OPTIONS"), settings_dict.get("TEST")
+        # Worker threads open their own connections from this same settings dict.
+        settings_dict["OPTIONS"] = dict(db_options)
+        settings_dict["TEST"] = {**(settings_dict.get("TEST") or {}), "NAME": path}
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            counters = {"ok": 0, "errors": 0}
+            lock = threading.Lock()
+            barrier = threading.Barrier(threads + 1)
+            workers = [
+                threading.Thread(target=self._worker, args=(n, ops, read_ratio, barrier, counters, lock))
+                for n in range(threads)
+            ]
+            for worker in workers:
+                worker.start()
+            barrier.wait()
+            started = time.perf_counter()
+            for worker in workers:
+                worker.join()
+            counters["seconds"] = time.perf_counter() - started
+            return counters
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            settings_dict["OPTIONS"], settings_dict["TEST"] = saved
+            for suffix in ("", "-wal", "-shm", "-journal"):
+                if os.path.exists(path + suffix):
+                    os.unlink(path + suffix)
+
+    def _worker(self, number, ops, read_ratio, barrier, counters, lock):
+        ok = errors = 0
+        every = max(1, round(1 / read_ratio)) if read_ratio > 0 else 0
+        barrier.wait()
+        try:
+            for i in range(ops):
+                try:
+                    if every and i % every == 0:
+                        order_stats(bucket="month")
+                    else:
+                        self._write(number, i)
+                    ok += 1
+                except OperationalError:
+                    errors += 1
+        finally:
+            connections.close_all()
+            with lock:
+                counters["ok"] += ok
+                counters["errors"] += errors
+
+    def _write(self, number, i):
+        with transaction.atomic():
+            order = Order.objects.create(
+                name=f"Bench {number}-{i}",
+                order_type=Order.INGOING if i % 2 else Order.OUTGOING,
+                price=100 + i,
+                date=datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 365),
+            )
+        write_entries([ActivityLog(action=ActivityLog.CREATE, model_name="Order", object_id=order.pk, object_repr=str(order))])
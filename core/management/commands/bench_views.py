@@ -0,0 +1,83 @@
+import datetime
+import json
+import platform
+import sqlite3
+import time
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.benchmarks import seed, scenarios, run_scenarios
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database with a synthetic dataset of the given size, time the dashboard, "
+        "export, order and log views with the test client and print p50/p95 latency, query counts "
+        "and peak memory per scenario as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=10_000, help="Number of orders to seed (e.g. 10000 to 5000000).")
+        parser.add_argument("--years", type=int, default=3, help="Spread the orders over this many years up to today.")
+        parser.add_argument("--repeat", type=int, default=20, help="Timed requests per scenario.")
+        parser.add_argument("--scenario", action="append", default=[], help="Only run scenarios whose label contains this text.")
+        parser.add_argument("--seed", type=int, default=1, help="Random seed for the synthetic data.")
+        parser.add_argument("--db-file", help="Build the test database in this file instead of in memory (for large sizes).")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        if options["orders"] < 1 or options["repeat"] < 1:
+            raise CommandError("--orders and --repeat must be positive.")
+        if options["db_file"]:
+            connection.settings_dict["TEST"] = {**(connection.settings_dict.get("TEST") or {}), "NAME": options["db_file"]}
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            report = self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps(report, cls=DjangoJSONEncoder, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(output + "\n")
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    def _run(self, options):
+        user = User.objects.create_user("bench-views")
+        self.stderr.write(f"Seeding {options['orders']} orders...")
+        started = time.perf_counter()
+        dataset = seed(options["orders"], years=options["years"], rng_seed=options["seed"], user=user)
+        seed_seconds = time.perf_counter() - started
+
+        client = Client()
+        client.force_login(user)
+        self.stderr.write(f"Seeded in {seed_seconds:.1f}s; timing views...")
+        results = run_scenarios(
+            client,
+            scenarios(dataset["date_from"], dataset["date_to"]),
+            options["repeat"],
+            only=options["scenario"],
+        )
+        return {
+            "created_at": datetime.datetime.now(datetime.timezone.utc),
+            "environment": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "database": connection.vendor,
+            },
+            "dataset": {**dataset, "seed": options["seed"], "seed_seconds": round(seed_seconds, 2)},
+            "repeat": options["repeat"],
+            "scenarios": results,
+        }
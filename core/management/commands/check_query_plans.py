@@ -0,0 +1,56 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.models import Order, Partner
+from core.queryplans import FULL_SCAN_ALLOWED, check_scenarios
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every main view against a throwaway test database, run EXPLAIN QUERY PLAN "
+        "on each SELECT and fail if any query falls back to a full table scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--allow-table", action="append", default=[], help="Also accept full scans of this table.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("check_query_plans needs the SQLite backend.")
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            problems = self._run(options["allow_table"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if problems:
+            for label, sql, plan, tables in problems:
+                self.stderr.write(f"[{label}] full scan of {', '.join(tables) or '-'}")
+                if sql:
+                    self.stderr.write(f"  {sql}")
+                for line in plan:
+                    self.stderr.write(f"    {line}")
+            raise CommandError(f"{len(problems)} query plan(s) use a full table scan.")
+        self.stdout.write(self.style.SUCCESS("No full table scans."))
+
+    def _run(self, allowed_tables):
+        user = User.objects.create_user("query-plan-check")
+        Partner.objects.create(name="Partner", joined_amount=0, percentage=50)
+        start = datetime.date(2025, 1, 1)
+        for i in range(30):
+            Order.objects.create(
+                name=f"Order {i}",
+                order_type=(Order.INGOING, Order.OUTGOING, None)[i % 3],
+                price=100 * (i + 1),
+                date=start + datetime.timedelta(days=i * 5),
+            )
+        client = Client()
+        client.force_login(user)
+        return check_scenarios(client, allowed=FULL_SCAN_ALLOWED | set(allowed_tables))
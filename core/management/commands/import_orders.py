@@ -0,0 +1,26 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import import_orders_logged
+
+
+class Command(BaseCommand):
+    help = "Import orders from a CSV file (columns: name, order_type, price, date, description, customer_name, customer_address)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--encoding", default="utf-8-sig")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.is_file():
+            raise CommandError(f"{path} does not exist.")
+        with path.open(encoding=options["encoding"], newline="") as stream:
+            result = import_orders_logged(None, stream, source=path.name, batch_size=options["batch_size"])
+        for line, message in result.errors:
+            self.stderr.write(f"line {line}: {message}")
+        if result.rejected > len(result.errors):
+            self.stderr.write(f"... and {result.rejected - len(result.errors)} more rejected rows")
+        self.stdout.write(self.style.SUCCESS(result.summary()))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily order rollup (DailyOrderStat) from the raw orders, or verify it with --verify."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verify", action="store_true", help="Only compare the rollup against the orders; exit non-zero on mismatch.")
+
+    def handle(self, *args, **options):
+        if options["verify"]:
+            mismatched = rollup.verify()
+            if mismatched:
+                for day in mismatched[:20]:
+                    self.stderr.write(f"mismatch on {day}")
+                raise CommandError(f"Rollup differs from orders on {len(mismatched)} day(s); run without --verify to rebuild.")
+            self.stdout.write(self.style.SUCCESS("Rollup matches orders."))
+            return
+        days = rollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollup for {days} day(s)."))
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (large exports). Start several to work in parallel; each job "
+        "is taken by exactly one worker. Also requeues jobs of dead workers and deletes expired ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty instead of polling.")
+        parser.add_argument("--poll", type=float, default=2.0, help="Seconds to wait when the queue is empty (default 2).")
+        parser.add_argument("--maintenance-interval", type=float, default=60.0, help="Seconds between stale-job and cleanup passes.")
+        parser.add_argument("--name", default=None, help="Worker name recorded on claimed jobs (default host:pid).")
+
+    def handle(self, *args, **options):
+        if options["poll"] <= 0 or options["maintenance_interval"] <= 0:
+            raise CommandError("--poll and --maintenance-interval must be positive.")
+        worker = options["name"] or jobs.default_worker_name()
+        self.stdout.write(f"Worker {worker} started.")
+        next_maintenance = 0.0
+        try:
+            while True:
+                close_old_connections()
+                if time.monotonic() >= next_maintenance:
+                    requeued, deleted = jobs.requeue_stale(), jobs.cleanup()
+                    if requeued or deleted:
+                        self.stdout.write(f"Requeued or failed {requeued} stale job(s), deleted {deleted} expired job(s).")
+                    next_maintenance = time.monotonic() + options["maintenance_interval"]
+                job = jobs.claim(worker)
+                if job is None:
+                    if options["once"]:
+                        return
+                    time.sleep(options["poll"])
+                    continue
+                job = jobs.run(job)
+                style = self.style.SUCCESS if job.status == job.DONE else self.style.ERROR
+                self.stdout.write(style(f"Job {job}: {job.progress} rows"))
+        except KeyboardInterrupt:
+            self.stdout.write(f"Worker {worker} stopped.")
+        finally:
+            close_old_connections()
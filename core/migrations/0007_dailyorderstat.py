@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:02
+
+from django.db import migrations, models
+
+
+def build_rollup(apps, schema_editor):
+    Order = apps.get_model('core', 'Order')
+    DailyOrderStat = apps.get_model('core', 'DailyOrderStat')
+    rows = {}
+    for date, order_type, price in Order.objects.values_list('date', 'order_type', 'price').iterator():
+        row = rows.setdefault(date, DailyOrderStat(date=date))
+        row.num_orders += 1
+        if order_type == 'IN':
+            row.total_ingoing += price
+            row.num_ingoing += 1
+        elif order_type == 'OUT':
+            row.total_outgoing += price
+            row.num_outgoing += 1
+        elif not order_type:
+            row.num_neutral += 1
+    DailyOrderStat.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_alter_order_order_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOrderStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('total_ingoing', models.BigIntegerField(default=0)),
+                ('total_outgoing', models.BigIntegerField(default=0)),
+                ('num_orders', models.BigIntegerField(default=0)),
+                ('num_ingoing', models.BigIntegerField(default=0)),
+                ('num_outgoing', models.BigIntegerField(default=0)),
+                ('num_neutral', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:05
+
+import core.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Trigram tokenization matches substrings like the previous icontains filters did, and
+# works for Arabic because it does not depend on word boundaries or letter case rules.
+CREATE_FTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS core_order_fts USING fts5(
+        name, description, customer_name, customer_address,
+        content='core_order', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_order_fts_ai AFTER INSERT ON core_order BEGIN
+        INSERT INTO core_order_fts(rowid, name, description, customer_name, customer_address)
+        VALUES (new.id, new.name, new.description, new.customer_name, new.customer_address);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_order_fts_ad AFTER DELETE ON core_order BEGIN
+        INSERT INTO core_order_fts(core_order_fts, rowid, name, description, customer_name, customer_address)
+        VALUES ('delete', old.id, old.name, old.description, old.customer_name, old.customer_address);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_order_fts_au AFTER UPDATE OF name, description, customer_name, customer_address ON core_order BEGIN
+        INSERT INTO core_order_fts(core_order_fts, rowid, name, description, customer_name, customer_address)
+        VALUES ('delete', old.id, old.name, old.description, old.customer_name, old.customer_address);
+        INSERT INTO core_order_fts(rowid, name, description, customer_name, customer_address)
+        VALUES (new.id, new.name, new.description, new.customer_name, new.customer_address);
+    END
+    """,
+    "INSERT INTO core_order_fts(core_order_fts) VALUES ('rebuild')",
+]
+
+DROP_FTS = [
+    "DROP TRIGGER IF EXISTS core_order_fts_ai",
+    "DROP TRIGGER IF EXISTS core_order_fts_ad",
+    "DROP TRIGGER IF EXISTS core_order_fts_au",
+    "DROP TABLE IF EXISTS core_order_fts",
+]
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_FTS:
+        schema_editor.execute(statement)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_FTS:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_order_activitylog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSearch',
+            fields=[
+                ('order', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='core.order')),
+                ('document', core.fields.FullTextDocumentField(db_column='core_order_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'core_order_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_counters(apps, schema_editor):
+    DataVersion = apps.get_model('core', 'DataVersion')
+    for name in ('order', 'partner'):
+        DataVersion.objects.get_or_create(name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_activitylog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('version', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_counters, migrations.RunPython.noop),
+    ]
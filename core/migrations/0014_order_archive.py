@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_changeevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(unique=True)),
+                ('total_ingoing', models.BigIntegerField(default=0)),
+                ('total_outgoing', models.BigIntegerField(default=0)),
+                ('num_orders', models.BigIntegerField(default=0)),
+                ('num_ingoing', models.BigIntegerField(default=0)),
+                ('num_outgoing', models.BigIntegerField(default=0)),
+                ('num_neutral', models.BigIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['year'],
+            },
+        ),
+        migrations.AddField(
+            model_name='dailyorderstat',
+            name='frozen',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('order_type', models.CharField(blank=True, choices=[('IN', 'Ingoing'), ('OUT', 'Outgoing')], max_length=3, null=True)),
+                ('price', models.BigIntegerField()),
+                ('date', models.DateField()),
+                ('description', models.TextField(blank=True)),
+                ('customer_name', models.CharField(blank=True, max_length=255)),
+                ('customer_address', models.TextField(blank=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-date', 'name'],
+                'indexes': [models.Index(fields=['-date', 'name'], name='archorder_date_name_idx'), models.Index(fields=['order_type', 'date'], name='archorder_type_date_idx')],
+            },
+        ),
+    ]
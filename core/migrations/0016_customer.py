@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:26
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+# A copy of core.customers.normalize_name as of this migration, so later changes there
+# do not change the keys this migration creates.
+_IGNORED = re.compile("[\u064b-\u065f\u0670\u0640]")
+_FOLDS = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ة": "ه"})
+
+
+def normalize_name(name):
+    name = unicodedata.normalize("NFKC", name or "")
+    name = _IGNORED.sub("", name).translate(_FOLDS).casefold()
+    return " ".join(name.split())[:255]
+
+
+def link_customers(apps, schema_editor):
+    """Create one Customer per normalized customer_name and point every live and archived order at it."""
+    Customer = apps.get_model('core', 'Customer')
+    models_ = [apps.get_model('core', 'Order'), apps.get_model('core', 'ArchivedOrder')]
+    found = {}  # key -> [name, address, {model: [order ids]}]
+    for model in models_:
+        rows = model.objects.exclude(customer_name='').order_by('id').values_list('id', 'customer_name', 'customer_address')
+        for pk, name, address in rows.iterator(chunk_size=2000):
+            key = normalize_name(name)
+            if not key:
+                continue
+            entry = found.setdefault(key, [' '.join(name.split()), '', {model: [] for model in models_}])
+            if not entry[1] and address.strip():
+                entry[1] = address.strip()
+            entry[2][model].append(pk)
+
+    Customer.objects.bulk_create([Customer(key=key, name=name, address=address) for key, (name, address, _) in found.items()], batch_size=1000)
+    ids = dict(Customer.objects.values_list('key', 'id'))
+    for key, (_, _, orders) in found.items():
+        for model, pks in orders.items():
+            for start in range(0, len(pks), 500):
+                model.objects.filter(id__in=pks[start:start + 500]).update(customer_id=ids[key])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Customer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('address', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='customer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_orders', to='core.customer'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='customer',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='core.customer'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', 'date', 'order_type', 'price'], name='order_customer_date_idx'),
+        ),
+        migrations.RunPython(link_customers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:32
+
+import importlib
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+# SQLite cannot ADD COLUMN a stored generated column, so AddField rebuilds core_order
+# (copying every row, which computes the column) and its triggers go with the old table.
+order_fts = importlib.import_module('core.migrations.0009_order_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_customer'),
+    ]
+
+    operations = [
+        # Restores the triggers after the rebuild when this migration is reversed.
+        migrations.RunPython(migrations.RunPython.noop, order_fts.create_fts),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='signed_amount',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(order_type='IN', then=models.F('price')), models.When(order_type='OUT', then=django.db.models.expressions.CombinedExpression(models.F('price'), '*', models.Value(-1))), default=models.Value(0), output_field=models.BigIntegerField()), output_field=models.BigIntegerField()),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='signed_amount',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(order_type='IN', then=models.F('price')), models.When(order_type='OUT', then=django.db.models.expressions.CombinedExpression(models.F('price'), '*', models.Value(-1))), default=models.Value(0), output_field=models.BigIntegerField()), output_field=models.BigIntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['signed_amount'], name='order_signed_amount_idx'),
+        ),
+        migrations.RunPython(order_fts.create_fts, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,10 @@
-from django.db import models
+import json
+import zlib
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from .fields import FullTextDocumentField
 
 
 class Partner(models.Model):
@@ -12,6 +18,53 @@ class Partner(models.Model):
     def __str__(self) -> str:
         return f"{self.name} ({self.percentage}%)"
 
+    # The version bump and the change-feed event (core.signals) commit together with the row.
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            return super().delete(*args, **kwargs)
+
+
+# The signed price: what an order adds to (IN) or takes from (OUT) the profit.
+SIGNED_AMOUNT = models.Case(
+    models.When(order_type="IN", then=models.F("price")),
+    models.When(order_type="OUT", then=-models.F("price")),
+    default=models.Value(0),
+    output_field=models.BigIntegerField(),
+)
+
+
+class Customer(models.Model):
+    """A customer, identified by the normalized form of the name typed on orders (see core.customers).
+
+    Orders keep the name and address as typed; ``Order.customer`` links them here
+    so lookups and per-customer totals use an index instead of the free text.
+    """
+
+    key = models.CharField(max_length=255, unique=True)
+    name = models.CharField(max_length=255)
+    address = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self) -> str:
+        return self.name
+
+    # Renaming or deleting a customer changes the order and customer lists: the ORDERS bump
+    # (core.signals) commits together with the row.
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            return super().delete(*args, **kwargs)
+
 
 class Order(models.Model):
     INGOING = "IN"
@@ -28,23 +81,58 @@ class Order(models.Model):
     description = models.TextField(blank=True)
     customer_name = models.CharField(max_length=255, blank=True)
     customer_address = models.TextField(blank=True)
+    # Set from customer_name on save; indexed through order_customer_date_idx, which leads with it.
+    customer = models.ForeignKey(Customer, null=True, blank=True, on_delete=models.SET_NULL, related_name="orders", db_index=False)
+    # Computed and stored by the database, so it can be filtered, sorted and summed in SQL.
+    signed_amount = models.GeneratedField(expression=SIGNED_AMOUNT, output_field=models.BigIntegerField(), db_persist=True)
 
     class Meta:
         ordering = ["-date", "name"]
+        indexes = [
+            # Default ordering and the export's ORDER BY -date, name.
+            models.Index(fields=["-date", "name"], name="order_date_name_idx"),
+            # Covers date-range aggregates (rollup rebuild, grouped stats) without touching the table.
+            models.Index(fields=["date", "order_type", "price"], name="order_date_type_price_idx"),
+            # orders_list filtered by type and sorted by date.
+            models.Index(fields=["order_type", "date"], name="order_type_date_idx"),
+            # Sorting/seeking by price and name; SQLite appends the rowid, giving the pk tie-breaker.
+            models.Index(fields=["price"], name="order_price_idx"),
+            models.Index(fields=["name"], name="order_name_idx"),
+            # A customer's orders by date, and per-customer totals grouped without touching the table.
+            models.Index(fields=["customer", "date", "order_type", "price"], name="order_customer_date_idx"),
+            # Sorting/seeking by signed amount.
+            models.Index(fields=["signed_amount"], name="order_signed_amount_idx"),
+        ]
 
     def __str__(self) -> str:
         direction = dict(self.TYPE_CHOICES).get(self.order_type, self.order_type)
         return f"{self.name} - {direction} - {self.price} on {self.date}"
 
-    @property
-    def signed_amount(self) -> float:
-        """Return price as positive for INGOING, negative for OUTGOING, and 0 for null/empty."""
-        if self.order_type == self.INGOING:
-            return self.price
-        elif self.order_type == self.OUTGOING:
-            return -self.price
-        else:
-            return 0
+    # The signal handlers in core.signals update the rollup, the data version and the
+    # change feed. One transaction keeps them together with the row, and since it is
+    # IMMEDIATE the previous state that pre_save reads cannot change underneath it.
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            return super().delete(*args, **kwargs)
+
+
+class OrderSearch(models.Model):
+    """Read-only mapping of the core_order_fts FTS5 index, kept in sync with Order by triggers.
+
+    The table, its trigram tokenizer and the triggers are created in migration 0009.
+    """
+
+    order = models.OneToOneField(Order, primary_key=True, db_column="rowid", on_delete=models.DO_NOTHING, related_name="search_entry")
+    document = FullTextDocumentField(db_column="core_order_fts")
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "core_order_fts"
 
 
 class ActivityLog(models.Model):
@@ -57,8 +145,10 @@ class ActivityLog(models.Model):
         (DELETE, "Delete"),
     ]
 
-    timestamp = models.DateTimeField(auto_now_add=True)
-    user = models.ForeignKey("auth.User", null=True, blank=True, on_delete=models.SET_NULL, related_name="activity_logs")
+    # Set when the entry is logged; buffered entries may be written later (see core.activity).
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
+    # Indexed through activitylog_user_ts_idx, which leads with user.
+    user = models.ForeignKey("auth.User", null=True, blank=True, on_delete=models.SET_NULL, related_name="activity_logs", db_index=False)
     action = models.CharField(max_length=12, choices=ACTION_CHOICES)
     model_name = models.CharField(max_length=100)
     object_id = models.BigIntegerField()
@@ -67,7 +157,203 @@ class ActivityLog(models.Model):
 
     class Meta:
         ordering = ["-timestamp"]
+        indexes = [
+            models.Index(fields=["-timestamp"], name="activitylog_timestamp_idx"),
+            # logs_list filters, each followed by the timestamp so the sort needs no temp b-tree.
+            models.Index(fields=["user", "-timestamp"], name="activitylog_user_ts_idx"),
+            models.Index(fields=["action", "-timestamp"], name="activitylog_action_ts_idx"),
+            models.Index(fields=["model_name", "object_id", "-timestamp"], name="activitylog_model_obj_idx"),
+            models.Index(fields=["object_id"], name="activitylog_object_idx"),
+        ]
 
     def __str__(self) -> str:
         who = self.user.username if self.user else "system"
-        return f"{self.timestamp} {who} {self.action} {self.model_name}#{self.object_id}"
\ No newline at end of file
+        return f"{self.timestamp} {who} {self.action} {self.model_name}#{self.object_id}"
+
+
+class DailyOrderStat(models.Model):
+    """Per-day rollup of Order totals, maintained incrementally by core.rollup.
+
+    Rows of archived years are ``frozen``: their orders have moved to ArchivedOrder
+    and the row keeps their totals, so statistics over any range still read this table only.
+    """
+
+    date = models.DateField(unique=True)
+    total_ingoing = models.BigIntegerField(default=0)
+    total_outgoing = models.BigIntegerField(default=0)
+    num_orders = models.BigIntegerField(default=0)
+    num_ingoing = models.BigIntegerField(default=0)
+    num_outgoing = models.BigIntegerField(default=0)
+    num_neutral = models.BigIntegerField(default=0)
+    frozen = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ["date"]
+
+    def __str__(self) -> str:
+        return f"{self.date}: +{self.total_ingoing} / -{self.total_outgoing} ({self.num_orders} orders)"
+
+
+class ArchivedOrder(models.Model):
+    """An order of a closed year, moved out of Order by ``manage.py archive_orders``. Read-only."""
+
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=255)
+    order_type = models.CharField(max_length=3, choices=Order.TYPE_CHOICES, null=True, blank=True)
+    price = models.BigIntegerField()
+    date = models.DateField()
+    description = models.TextField(blank=True)
+    customer_name = models.CharField(max_length=255, blank=True)
+    customer_address = models.TextField(blank=True)
+    customer = models.ForeignKey(Customer, null=True, blank=True, on_delete=models.SET_NULL, related_name="archived_orders")
+    signed_amount = models.GeneratedField(expression=SIGNED_AMOUNT, output_field=models.BigIntegerField(), db_persist=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-date", "name"]
+        indexes = [
+            models.Index(fields=["-date", "name"], name="archorder_date_name_idx"),
+            models.Index(fields=["order_type", "date"], name="archorder_type_date_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} - {self.order_type or 'N/A'} - {self.price}"
+
+
+class ArchivedYear(models.Model):
+    """A closed year whose orders are in ArchivedOrder, with its totals frozen at archive time."""
+
+    year = models.IntegerField(unique=True)
+    total_ingoing = models.BigIntegerField(default=0)
+    total_outgoing = models.BigIntegerField(default=0)
+    num_orders = models.BigIntegerField(default=0)
+    num_ingoing = models.BigIntegerField(default=0)
+    num_outgoing = models.BigIntegerField(default=0)
+    num_neutral = models.BigIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["year"]
+
+    def __str__(self) -> str:
+        return f"{self.year}: {self.num_orders} orders archived"
+
+
+class ActivityLogArchive(models.Model):
+    """A batch of old ActivityLog rows, stored as zlib-compressed JSON lines.
+
+    Written by ``manage.py archive_activity_logs`` so the live table stays small.
+    """
+
+    first_id = models.BigIntegerField()
+    last_id = models.BigIntegerField()
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField(db_index=True)
+    count = models.IntegerField()
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["first_id"]
+
+    def __str__(self) -> str:
+        return f"{self.count} log entries {self.first_timestamp} - {self.last_timestamp}"
+
+    def entries(self) -> list:
+        return [json.loads(line) for line in zlib.decompress(bytes(self.data)).decode("utf-8").splitlines()]
+
+
+class DataVersion(models.Model):
+    """A counter bumped on every write to a group of models (see core.versioning)."""
+
+    ORDERS = "order"
+    PARTNERS = "partner"
+    ACTIVITY = "activitylog"
+
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f"{self.name} v{self.version}"
+
+
+class ChangeEvent(models.Model):
+    """One row per created, updated or deleted Order/Partner; the id is the change-feed sequence.
+
+    SQLite has a single writer and Django declares the id AUTOINCREMENT there, so ids
+    are handed out in commit order and never reused.
+    """
+
+    CREATE = "CREATE"
+    UPDATE = "UPDATE"
+    DELETE = "DELETE"
+    ACTION_CHOICES = [
+        (CREATE, "Create"),
+        (UPDATE, "Update"),
+        (DELETE, "Delete"),
+    ]
+
+    model_name = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=12, choices=ACTION_CHOICES)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["model_name", "id"], name="changeevent_model_seq_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"#{self.pk} {self.action} {self.model_name}#{self.object_id}"
+
+
+class Job(models.Model):
+    """A unit of background work (e.g. a large export) run by ``manage.py run_jobs`` (see core.jobs)."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    user = models.ForeignKey("auth.User", null=True, blank=True, on_delete=models.CASCADE, related_name="jobs")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    progress = models.BigIntegerField(default=0)
+    total = models.BigIntegerField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    result_path = models.CharField(max_length=500, blank=True)
+    result_name = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [
+            # Claiming the oldest queued job and finding stale running ones.
+            models.Index(fields=["status", "id"], name="job_status_idx"),
+            models.Index(fields=["finished_at"], name="job_finished_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"#{self.pk} {self.kind} ({self.status})"
+
+    @property
+    def percent(self):
+        if self.status == self.DONE:
+            return 100
+        if not self.total:
+            return None
+        return min(100, int(self.progress * 100 / self.total))
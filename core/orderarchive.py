@@ -0,0 +1,84 @@
+"""Cold storage for orders of closed years.
+
+``archive_year`` moves a year's orders from Order to ArchivedOrder and records
+their totals in ArchivedYear. The year's DailyOrderStat rows are rewritten from
+the orders being moved and marked ``frozen``, so the dashboard, the series
+endpoint and partner statements keep reading one rollup table and see the same
+figures as before. ``orders_list`` searches ArchivedOrder on request.
+
+An archived year is closed: OrderForm rejects dates inside it and bulk date
+shifts that would move orders into it are rolled back.
+"""
+import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import changes, rollup, versioning
+from .signals import deletes_accounted_for
+from .models import Order, ArchivedOrder, ArchivedYear, DailyOrderStat, DataVersion, ChangeEvent
+from .stats import STAT_FIELDS
+
+
+ARCHIVE_FIELDS = ["id", "name", "order_type", "price", "date", "description", "customer_name", "customer_address", "customer_id"]
+
+
+class ClosedYearError(ValueError):
+    pass
+
+
+def archived_years() -> set:
+    return set(ArchivedYear.objects.values_list("year", flat=True))
+
+
+def check_open(qs, years=None) -> None:
+    """Raise ClosedYearError if any order in `qs` is dated inside an archived year."""
+    years = archived_years() if years is None else years
+    if years and qs.filter(date__year__in=years).exists():
+        raise ClosedYearError("Orders cannot be moved into an archived year.")
+
+
+def _year_range(year: int):
+    return datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+
+
+def archive_year(year: int, batch_size: int = 1000) -> int:
+    """Move every order dated in `year` to ArchivedOrder and freeze the year's totals.
+
+    Runs in one transaction, so the live table, the archive and the rollup never
+    disagree. Returns the number of orders moved.
+    """
+    if year >= timezone.localdate().year:
+        raise ClosedYearError(f"{year} is not closed yet; only past years can be archived.")
+    if ArchivedYear.objects.filter(year=year).exists():
+        raise ClosedYearError(f"{year} is already archived.")
+    start, end = _year_range(year)
+    live = Order.objects.filter(date__range=(start, end))
+    moved = 0
+    with transaction.atomic():
+        # Rewrite the year's rollup rows from the orders themselves before freezing them.
+        days = rollup.compute_from_orders(live)
+        DailyOrderStat.objects.filter(date__range=(start, end)).delete()
+        DailyOrderStat.objects.bulk_create(
+            [DailyOrderStat(date=day, frozen=True, **fields) for day, fields in days.items()],
+            batch_size=batch_size,
+        )
+        totals = {field: sum(row[field] or 0 for row in days.values()) for field in STAT_FIELDS}
+        ArchivedYear.objects.create(year=year, **totals)
+
+        last_id = 0
+        while True:
+            rows = list(live.filter(id__gt=last_id).order_by("id").values(*ARCHIVE_FIELDS)[:batch_size])
+            if not rows:
+                break
+            ids = [row["id"] for row in rows]
+            ArchivedOrder.objects.bulk_create([ArchivedOrder(**row) for row in rows])
+            # post_delete would take the orders out of the rollup rows frozen above.
+            with deletes_accounted_for():
+                Order.objects.filter(id__in=ids).delete()
+            changes.record(Order, ChangeEvent.DELETE, ids)
+            last_id = ids[-1]
+            moved += len(rows)
+        versioning.bump(DataVersion.ORDERS)
+    return moved
+
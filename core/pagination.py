@@ -0,0 +1,117 @@
+"""Keyset (seek) pagination.
+
+Instead of OFFSET/LIMIT, each page remembers the sort value and primary key of
+its first and last rows in an opaque cursor, and the next page is fetched with
+``WHERE (field, pk) > (value, last_pk)``. Any page costs the same as the first
+one and no COUNT(*) is needed.
+"""
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values: dict) -> str:
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(str(exc)) from exc
+    if not isinstance(values, dict) or "pk" not in values or "v" not in values:
+        raise InvalidCursor("cursor is missing its position")
+    if type(values["pk"]) is not int:
+        raise InvalidCursor("cursor has a non-integer pk")
+    return values
+
+
+def _value(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def _pk(row):
+    return row.get("pk", row.get("id")) if isinstance(row, dict) else row.pk
+
+
+class KeysetPage:
+    def __init__(self, object_list, ordering, has_next, has_previous):
+        self.object_list = object_list
+        self.ordering = ordering
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def _cursor(self, row, direction):
+        field = self.ordering.lstrip("-")
+        return encode_cursor({"v": _value(row, field), "pk": _pk(row), "d": direction})
+
+    @property
+    def next_cursor(self):
+        if not self.has_next or not self.object_list:
+            return None
+        return self._cursor(self.object_list[-1], "next")
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous or not self.object_list:
+            return None
+        return self._cursor(self.object_list[0], "prev")
+
+
+def paginate_keyset(qs, ordering: str, per_page: int, cursor: str = None) -> KeysetPage:
+    """Return one page of `qs` sorted by `ordering` ("field" or "-field") with pk as tie-breaker.
+
+    The sort field must be non-nullable so (field, pk) is a strict total order.
+    """
+    descending = ordering.startswith("-")
+    field = ordering.lstrip("-")
+    position = decode_cursor(cursor) if cursor else None
+    backwards = bool(position) and position.get("d") == "prev"
+
+    # Walking backwards is walking forwards over the reversed ordering.
+    reverse = descending != backwards
+    if position is not None:
+        value = position["v"]
+        try:
+            value = qs.model._meta.get_field(field).to_python(value)
+        except FieldDoesNotExist:
+            # An annotation such as a search rank; JSON already restored it.
+            if type(value) not in (int, float):
+                raise InvalidCursor("cursor has a non-numeric value")
+        except ValidationError as exc:
+            raise InvalidCursor("; ".join(exc.messages)) from exc
+        except TypeError as exc:
+            raise InvalidCursor(str(exc)) from exc
+        pk = position["pk"]
+        op = "lt" if reverse else "gt"
+        try:
+            qs = qs.filter(Q(**{f"{field}__{op}": value}) | Q(**{field: value, f"pk__{op}": pk}))
+        except (ValueError, TypeError) as exc:
+            # A tampered cursor whose value the lookup cannot use, such as null or a list.
+            raise InvalidCursor(str(exc)) from exc
+    prefix = "-" if reverse else ""
+    rows = list(qs.order_by(f"{prefix}{field}", f"{prefix}pk")[:per_page + 1])
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+        return KeysetPage(rows, ordering, has_next=True, has_previous=more)
+    return KeysetPage(rows, ordering, has_next=more, has_previous=position is not None)
@@ -0,0 +1,116 @@
+"""Run the views' real queries through EXPLAIN QUERY PLAN and report full table scans.
+
+Used by ``manage.py check_query_plans``. Each scenario is a GET request; every
+SELECT it issues is captured with its parameters and explained on SQLite.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+
+from .pagination import encode_cursor
+
+
+# Tables that the app reads in full on purpose: the partner list is tiny and shown whole,
+# the rollup has one row per day, and the customer search matches substrings of the
+# customer table (one row per customer) before looking up their orders by index.
+FULL_SCAN_ALLOWED = {"core_partner", "core_dailyorderstat", "core_customer"}
+
+_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+# Subqueries alias their tables (FROM "core_customer" U0) and the plan names the alias.
+_ALIAS = re.compile(r'"(\w+)" ([A-Z]\d+)\b')
+
+
+def _cursor(value, pk=1, direction="next"):
+    return encode_cursor({"v": value, "pk": pk, "d": direction})
+
+
+SCENARIOS = [
+    ("dashboard", "/"),
+    ("dashboard range", "/?date_from=2025-01-01&date_to=2025-03-31"),
+    ("dashboard series", "/dashboard/series/?bucket=month&date_from=2025-01-01"),
+    ("dashboard export", "/dashboard/export/?date_from=2025-01-01&date_to=2025-03-31"),
+    ("orders", "/orders/"),
+    ("orders by type", "/orders/?order_type=IN"),
+    ("orders date range", "/orders/?date_from=2025-01-01&date_to=2025-01-31"),
+    ("orders price range", "/orders/?price_min=100&price_max=5000&sort_by=price"),
+    ("orders type + range", "/orders/?order_type=OUT&date_from=2025-01-01&date_to=2025-06-30"),
+    ("orders sort date asc", "/orders/?sort_by=date&cursor=" + _cursor("2025-01-01")),
+    ("orders sort date desc", "/orders/?sort_by=-date&cursor=" + _cursor("2025-06-01")),
+    ("orders sort price", "/orders/?sort_by=-price&cursor=" + _cursor(1000)),
+    ("orders sort name", "/orders/?sort_by=name&cursor=" + _cursor("m")),
+    ("orders sort name back", "/orders/?sort_by=-name&cursor=" + _cursor("m", direction="prev")),
+    ("orders sort signed", "/orders/?sort_by=-signed_amount&cursor=" + _cursor(500)),
+    ("api orders sort signed", "/api/orders/?sort_by=signed_amount&fields=id,signed_amount"),
+    ("orders search", "/orders/?search=Order"),
+    ("orders customer search", "/orders/?customer_search=Customer&sort_by=-date"),
+    ("orders both searches", "/orders/?search=Order&customer_search=Customer&order_type=IN"),
+    ("orders of a customer", "/orders/?customer=1"),
+    ("orders archive", "/orders/?archive=on"),
+    ("orders archive by type", "/orders/?archive=on&order_type=IN&date_from=2020-01-01&date_to=2020-12-31"),
+    ("customers", "/customers/"),
+    ("customers by range", "/customers/?date_from=2025-01-01&date_to=2025-03-31&sort_by=-num_orders"),
+    ("customers search", "/customers/?search=Customer"),
+    ("partners", "/partners/"),
+    ("partner statement", "/partners/statement/?year=2025&period=month"),
+    ("logs", "/logs/"),
+    ("logs by user", "/logs/?user=1"),
+    ("logs by action", "/logs/?action=UPDATE"),
+    ("logs by object", "/logs/?model_name=Order&object_id=3"),
+    ("logs by time", "/logs/?time_from=2025-01-01T00:00&time_to=2025-02-01T00:00"),
+    ("logs next page", "/logs/?action=CREATE&cursor=" + _cursor("2025-01-01T00:00:00+00:00", pk=10)),
+    ("change feed", "/api/changes/?since=1"),
+    ("change feed orders", "/api/changes/?since=1&models=order"),
+]
+
+
+@contextmanager
+def capture_selects():
+    """Collect (sql, params) for every SELECT run on the default connection."""
+    captured = []
+
+    def wrapper(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith("SELECT"):
+            captured.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield captured
+
+
+def explain(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params or ())
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan, allowed=FULL_SCAN_ALLOWED, sql=""):
+    """Return the tables in `plan` that are read with a plain SCAN (no index)."""
+    aliases = dict((alias, table) for table, alias in _ALIAS.findall(sql))
+    tables = []
+    for line in plan:
+        match = _SCAN.match(line.strip())
+        if match and aliases.get(match.group(1), match.group(1)) not in allowed:
+            tables.append(match.group(1))
+    return tables
+
+
+def check_scenarios(client, scenarios=SCENARIOS, allowed=FULL_SCAN_ALLOWED):
+    """Request every scenario and return a list of problems: (label, sql, plan, tables)."""
+    if connection.vendor != "sqlite":
+        raise RuntimeError("EXPLAIN QUERY PLAN checks only run on SQLite.")
+    problems = []
+    for label, url in scenarios:
+        with capture_selects() as queries:
+            response = client.get(url)
+            if getattr(response, "streaming", False):
+                b"".join(response.streaming_content)
+        if response.status_code != 200:
+            problems.append((label, None, [f"HTTP {response.status_code}"], []))
+            continue
+        for sql, params in queries:
+            plan = explain(sql, params)
+            tables = full_scans(plan, allowed, sql)
+            if tables:
+                problems.append((label, sql, plan, tables))
+    return problems
@@ -0,0 +1,124 @@
+"""Server-side cache for computed dashboard results.
+
+Entries live in the ``"dashboard"`` cache alias (see ``settings.CACHES``) and are
+keyed by their parameters plus the current DataVersion counters they depend
+on. A write to Order or Partner bumps a counter, so later reads use a new key
+and can never see a stale value; old entries are simply evicted by the
+backend (least recently used first for the default local-memory backend).
+
+``adashboard_summary`` is the async variant used under ASGI: on a miss the
+totals aggregate and the partner list are read concurrently (see core.asyncdb).
+"""
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+
+from . import asyncdb, versioning
+from .models import DataVersion, Partner
+from .stats import order_stats, partner_shares, partner_statement as compute_partner_statement
+
+
+CACHE_ALIAS = "dashboard"
+HITS_KEY = "resultcache:hits"
+MISSES_KEY = "resultcache:misses"
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _count(key: str) -> None:
+    cache = _cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        # add() fails only if another process created the counter in the meantime.
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def _lookup(namespace: str, params: dict, depends_on, versions=None):
+    """Return (key, cached value or None) for the parameters at the current data versions."""
+    versions = versioning.current(*depends_on) if versions is None else versions
+    signature = json.dumps(
+        {"params": params, "versions": {name: version for name, (version, _) in versions.items()}},
+        sort_keys=True, default=str,
+    )
+    key = f"{namespace}:{hashlib.sha1(signature.encode()).hexdigest()}"
+    value = _cache().get(key)
+    _count(MISSES_KEY if value is None else HITS_KEY)
+    return key, value
+
+
+def get_or_compute(namespace: str, params: dict, depends_on, compute, versions=None):
+    """Return the cached result of `compute()`; `versions` may pass counters already read for `depends_on`."""
+    key, value = _lookup(namespace, params, depends_on, versions)
+    if value is None:
+        value = compute()
+        _cache().set(key, value)
+    return value
+
+
+async def aget_or_compute(namespace: str, params: dict, depends_on, compute):
+    """get_or_compute() for async callers; `compute` is a coroutine function."""
+    key, value = await sync_to_async(_lookup)(namespace, params, depends_on)
+    if value is None:
+        value = await compute()
+        await sync_to_async(_cache().set)(key, value)
+    return value
+
+
+def dashboard_summary(date_from=None, date_to=None) -> dict:
+    """Totals and partner shares for a date range, cached per range and data version."""
+    def compute():
+        totals = order_stats(date_from, date_to)["totals"]
+        return {"totals": totals, "partner_rows": partner_shares(totals["total_profit"])}
+
+    return get_or_compute(
+        "dashboard",
+        {"date_from": date_from, "date_to": date_to},
+        (DataVersion.ORDERS, DataVersion.PARTNERS),
+        compute,
+    )
+
+
+async def adashboard_summary(date_from=None, date_to=None) -> dict:
+    """dashboard_summary() for async views, sharing its cache entries."""
+    async def compute():
+        totals, partners = await asyncdb.gather(
+            lambda: order_stats(date_from, date_to)["totals"],
+            lambda: list(Partner.objects.all()),
+        )
+        return {"totals": totals, "partner_rows": partner_shares(totals["total_profit"], partners)}
+
+    return await aget_or_compute(
+        "dashboard",
+        {"date_from": date_from, "date_to": date_to},
+        (DataVersion.ORDERS, DataVersion.PARTNERS),
+        compute,
+    )
+
+
+def partner_statement(periods) -> dict:
+    """partner_statement() for a list of (label, start, end) periods, cached like dashboard_summary."""
+    return get_or_compute(
+        "partner_statement",
+        {"periods": periods},
+        (DataVersion.ORDERS, DataVersion.PARTNERS),
+        lambda: compute_partner_statement(periods),
+    )
+
+
+def cache_stats() -> dict:
+    cache = _cache()
+    hits = cache.get(HITS_KEY) or 0
+    misses = cache.get(MISSES_KEY) or 0
+    lookups = hits + misses
+    return {
+        "backend": cache.__class__.__name__,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / lookups, 4) if lookups else None,
+    }
@@ -0,0 +1,104 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Sum, Count, F
+
+from .models import Order, DailyOrderStat
+from .stats import STAT_FIELDS, order_aggregates
+
+
+def order_contribution(order_type, price, count: int = 1) -> dict:
+    """Return what `count` orders of the given type and summed `price` add to a DailyOrderStat row."""
+    delta = {"num_orders": count}
+    if order_type == Order.INGOING:
+        delta["total_ingoing"] = price or 0
+        delta["num_ingoing"] = count
+    elif order_type == Order.OUTGOING:
+        delta["total_outgoing"] = price or 0
+        delta["num_outgoing"] = count
+    elif not order_type:
+        delta["num_neutral"] = count
+    return delta
+
+
+def apply_deltas(deltas) -> None:
+    """Add per-date field deltas ({date: {field: amount}}) to the rollup table."""
+    deltas = {day: {k: v for k, v in fields.items() if v} for day, fields in deltas.items()}
+    deltas = {day: fields for day, fields in deltas.items() if fields}
+    if not deltas:
+        return
+    with transaction.atomic():
+        existing = set(DailyOrderStat.objects.filter(date__in=list(deltas)).values_list("date", flat=True))
+        DailyOrderStat.objects.bulk_create([
+            DailyOrderStat(date=day, **fields) for day, fields in deltas.items() if day not in existing
+        ])
+        for day in existing:
+            fields = deltas[day]
+            DailyOrderStat.objects.filter(date=day).update(**{k: F(k) + v for k, v in fields.items()})
+        DailyOrderStat.objects.filter(date__in=existing, num_orders__lte=0, frozen=False).delete()
+
+
+def _merge(deltas, day, contribution, sign: int) -> None:
+    for field, amount in contribution.items():
+        deltas[day][field] = deltas[day].get(field, 0) + sign * amount
+
+
+def apply_orders(orders, sign: int = 1) -> None:
+    """Add (sign=1) or remove (sign=-1) in-memory orders, e.g. after bulk_create."""
+    deltas = defaultdict(dict)
+    for order in orders:
+        _merge(deltas, order.date, order_contribution(order.order_type, order.price), sign)
+    apply_deltas(deltas)
+
+
+def replace_order(previous, current) -> None:
+    """Move one order's contribution from its previous state (or nothing) to its current state."""
+    deltas = defaultdict(dict)
+    if previous is not None:
+        _merge(deltas, previous.date, order_contribution(previous.order_type, previous.price), -1)
+    _merge(deltas, current.date, order_contribution(current.order_type, current.price), 1)
+    apply_deltas(deltas)
+
+
+def apply_queryset(qs, sign: int = 1) -> None:
+    """Add or remove the orders matched by `qs` using one grouped query; call before a bulk UPDATE/DELETE."""
+    deltas = defaultdict(dict)
+    grouped = qs.order_by().values("date", "order_type").annotate(total=Sum("price"), n=Count("id"))
+    for row in grouped:
+        _merge(deltas, row["date"], order_contribution(row["order_type"], row["total"], row["n"]), sign)
+    apply_deltas(deltas)
+
+
+def compute_from_orders(qs=None) -> dict:
+    """Compute the rollup rows straight from Order, keyed by date."""
+    qs = Order.objects.all() if qs is None else qs
+    rows = qs.order_by().values("date").annotate(**order_aggregates())
+    return {row.pop("date"): row for row in rows}
+
+
+def rebuild(batch_size: int = 1000) -> int:
+    """Replace the live rollup rows with fresh totals computed from Order. Returns the number of days written.
+
+    Frozen rows of archived years (see core.orderarchive) are kept as they are.
+    """
+    expected = compute_from_orders()
+    with transaction.atomic():
+        DailyOrderStat.objects.filter(frozen=False).delete()
+        DailyOrderStat.objects.bulk_create(
+            [DailyOrderStat(date=day, **fields) for day, fields in expected.items()],
+            batch_size=batch_size,
+        )
+    return len(expected)
+
+
+def verify() -> list:
+    """Return the dates whose live rollup row disagrees with the raw orders."""
+    expected = compute_from_orders()
+    stored = {row.pop("date"): row for row in DailyOrderStat.objects.filter(frozen=False).values("date", *STAT_FIELDS)}
+    mismatched = []
+    for day in sorted(set(expected) | set(stored)):
+        want = expected.get(day, {})
+        have = stored.get(day, {})
+        if any((want.get(f) or 0) != (have.get(f) or 0) for f in STAT_FIELDS):
+            mismatched.append(day)
+    return mismatched
@@ -0,0 +1,64 @@
+"""Full-text search over orders backed by the core_order_fts FTS5 table.
+
+The index uses the trigram tokenizer, so a term matches wherever it appears
+inside a field (like ``icontains``), in any script. Terms shorter than three
+characters cannot be looked up in a trigram index and fall back to ``icontains``.
+Other database backends, and ArchivedOrder (which has no index), always use ``icontains``.
+
+The customer search matches orders whose customer's name matches (see
+core.customers), through the ``customer_id`` index, or whose own
+``customer_address`` contains the term, through the index's customer_address
+column. Addresses are matched per order: a customer keeps only the first one
+seen, and orders without a customer name have no customer at all.
+"""
+from django.db import connection
+from django.db.models import F, Q
+
+from . import customers
+from .models import Order, OrderSearch
+
+
+MIN_TERM_LENGTH = 3
+
+TEXT_COLUMNS = ["name", "description"]
+ADDRESS_COLUMNS = ["customer_address"]
+
+
+def fts_available() -> bool:
+    return connection.vendor == "sqlite"
+
+
+def _phrase(columns, term: str) -> str:
+    escaped = term.replace('"', '""')
+    return "{%s} : \"%s\"" % (" ".join(columns), escaped)
+
+
+def _icontains(columns, term: str) -> Q:
+    condition = Q()
+    for column in columns:
+        condition |= Q(**{f"{column}__icontains": term})
+    return condition
+
+
+def _address_matches(model, term: str) -> Q:
+    if fts_available() and model is Order and len(term) >= MIN_TERM_LENGTH:
+        return Q(pk__in=OrderSearch.objects.filter(document__match=_phrase(ADDRESS_COLUMNS, term)).values("order_id"))
+    return _icontains(ADDRESS_COLUMNS, term)
+
+
+def search_orders(qs, search: str = "", customer_search: str = ""):
+    """Filter `qs` by the text and customer search terms.
+
+    Returns ``(qs, ranked)``; when ``ranked`` is true the queryset carries a
+    ``search_rank`` annotation (bm25, lower is better) that can be sorted on.
+    """
+    search = (search or "").strip()
+    customer_search = (customer_search or "").strip()
+    if customer_search:
+        qs = qs.filter(Q(customer__in=customers.matching(customer_search, addresses=False)) | _address_matches(qs.model, customer_search))
+    if not search:
+        return qs, False
+    if not (fts_available() and qs.model is Order and len(search) >= MIN_TERM_LENGTH):
+        return qs.filter(_icontains(TEXT_COLUMNS, search)), False
+    qs = qs.filter(search_entry__document__match=_phrase(TEXT_COLUMNS, search))
+    return qs.annotate(search_rank=F("search_entry__rank")), True
@@ -0,0 +1,91 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import changes, customers, rollup, versioning
+from .models import Order, Partner, Customer, DataVersion, ChangeEvent
+
+
+_deletes_accounted = ContextVar("deletes_accounted", default=False)
+
+
+@contextmanager
+def deletes_accounted_for():
+    """Make update_rollup_on_delete stand back for order deletes inside the block.
+
+    For callers that adjust the rollup, DataVersion and change feed once for a
+    whole set of orders before running a plain ``QuerySet.delete()``.
+    """
+    token = _deletes_accounted.set(True)
+    try:
+        yield
+    finally:
+        _deletes_accounted.reset(token)
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_state(sender, instance, raw=False, **kwargs):
+    """Keep the stored date/type/price so post_save can move the order between rollup rows.
+
+    Runs inside the transaction opened by Order.save, so the row cannot change before post_save.
+    """
+    instance._rollup_previous = None
+    if raw or instance.pk is None:
+        return
+    instance._rollup_previous = Order.objects.filter(pk=instance.pk).values("date", "order_type", "price", "customer_name", "customer_id").first()
+
+
+@receiver(pre_save, sender=Order)
+def link_order_customer(sender, instance, raw=False, **kwargs):
+    """Link the order to the Customer for its name, unless the name is unchanged (runs after remember_order_state)."""
+    if raw:
+        return
+    previous = instance._rollup_previous
+    if previous is None or previous["customer_id"] is None or previous["customer_name"] != instance.customer_name:
+        customers.link(instance)
+
+
+@receiver(post_save, sender=Order)
+def update_rollup_on_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_rollup_previous", None)
+    if previous is not None:
+        previous = Order(date=previous["date"], order_type=previous["order_type"], price=previous["price"])
+    rollup.replace_order(previous, instance)
+    versioning.bump(DataVersion.ORDERS)
+    changes.record(Order, ChangeEvent.CREATE if created else ChangeEvent.UPDATE, [instance.pk])
+
+
+@receiver(post_delete, sender=Order)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    if _deletes_accounted.get():
+        return
+    rollup.apply_orders([instance], sign=-1)
+    versioning.bump(DataVersion.ORDERS)
+    changes.record(Order, ChangeEvent.DELETE, [instance.pk])
+
+
+@receiver(post_save, sender=Partner)
+def record_partner_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    versioning.bump(DataVersion.PARTNERS)
+    changes.record(Partner, ChangeEvent.CREATE if created else ChangeEvent.UPDATE, [instance.pk])
+
+
+@receiver(post_delete, sender=Partner)
+def record_partner_delete(sender, instance, **kwargs):
+    versioning.bump(DataVersion.PARTNERS)
+    changes.record(Partner, ChangeEvent.DELETE, [instance.pk])
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def bump_orders_on_customer_change(sender, instance, raw=False, **kwargs):
+    """Customer names and addresses are shown and searched with the orders (e.g. edits in the admin)."""
+    if raw:
+        return
+    versioning.bump(DataVersion.ORDERS)
@@ -0,0 +1,182 @@
+"""Order statistics shared by the dashboard, its CSV export and the series endpoint.
+
+Date-range totals come from the DailyOrderStat rollup (see core.rollup), so every
+figure and every time bucket is produced by a single grouped query whose cost
+grows with the number of days in the range, not with the number of orders.
+Archived years keep frozen rows in the same table (see core.orderarchive), so
+every figure covers live and archived orders alike.
+"""
+import calendar
+import datetime
+from decimal import Decimal
+
+from django.db.models import Sum, Count, Case, When, Q, F, Value, IntegerField, BigIntegerField
+from django.db.models.functions import TruncWeek, TruncMonth
+
+from .models import Order, Partner, DailyOrderStat
+
+
+STAT_FIELDS = ["total_ingoing", "total_outgoing", "num_orders", "num_ingoing", "num_outgoing", "num_neutral"]
+
+BUCKETS = {
+    "day": None,
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+
+
+def order_aggregates() -> dict:
+    """Conditional aggregates over Order producing every STAT_FIELDS value in one statement."""
+    neutral = Q(order_type__isnull=True) | Q(order_type="")
+    return {
+        "total_ingoing": Sum(Case(When(order_type=Order.INGOING, then=F("price")), default=0, output_field=BigIntegerField())),
+        "total_outgoing": Sum(Case(When(order_type=Order.OUTGOING, then=F("price")), default=0, output_field=BigIntegerField())),
+        "num_orders": Count("id"),
+        "num_ingoing": Count("id", filter=Q(order_type=Order.INGOING)),
+        "num_outgoing": Count("id", filter=Q(order_type=Order.OUTGOING)),
+        "num_neutral": Count("id", filter=neutral),
+    }
+
+
+def _with_profit(row: dict) -> dict:
+    row = dict(row)
+    for field in STAT_FIELDS:
+        row[field] = row.get(field) or 0
+    row["total_profit"] = row["total_ingoing"] - row["total_outgoing"]
+    return row
+
+
+def empty_totals() -> dict:
+    return _with_profit({})
+
+
+def order_stats(date_from=None, date_to=None, bucket: str = None) -> dict:
+    """Return {"totals": {...}, "series": [...]} for the date range.
+
+    With a bucket ("day", "week" or "month") the rows are grouped per period and the
+    totals are summed from those same rows; without one a single aggregate is run.
+    """
+    qs = DailyOrderStat.objects.all()
+    if date_from:
+        qs = qs.filter(date__gte=date_from)
+    if date_to:
+        qs = qs.filter(date__lte=date_to)
+    sums = {field: Sum(field) for field in STAT_FIELDS}
+
+    if bucket is None:
+        return {"totals": _with_profit(qs.aggregate(**sums)), "series": []}
+
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket {bucket!r}; expected one of {', '.join(BUCKETS)}")
+    trunc = BUCKETS[bucket]
+    period = F("date") if trunc is None else trunc("date")
+    rows = qs.order_by().annotate(period=period).values("period").annotate(**sums).order_by("period")
+
+    series = [_with_profit(row) for row in rows]
+    totals = empty_totals()
+    for row in series:
+        for field in STAT_FIELDS:
+            totals[field] += row[field]
+    totals["total_profit"] = totals["total_ingoing"] - totals["total_outgoing"]
+    return {"totals": totals, "series": series}
+
+
+def rollup_counts(date_from=None, date_to=None, order_type: str = None) -> dict:
+    """Count live and archived orders in a date range (optionally of one type) from the rollup.
+
+    Returns {"live": n, "archived": n} with one aggregate; archived days are the frozen rows.
+    """
+    field = {Order.INGOING: "num_ingoing", Order.OUTGOING: "num_outgoing"}.get(order_type, "num_orders")
+    qs = DailyOrderStat.objects.all()
+    if date_from:
+        qs = qs.filter(date__gte=date_from)
+    if date_to:
+        qs = qs.filter(date__lte=date_to)
+    counts = qs.aggregate(live=Sum(field, filter=Q(frozen=False)), archived=Sum(field, filter=Q(frozen=True)))
+    return {key: value or 0 for key, value in counts.items()}
+
+
+def _basis_points(percentage) -> int:
+    """Partner.percentage (two decimal places) as an integer number of 1/10000ths."""
+    return int((percentage or Decimal("0")) * 100)
+
+
+def _share(profit: int, basis_points: int) -> Decimal:
+    # Decimal(profit) * percentage / 100 with the percentage rebuilt from its basis points: the
+    # exact division keeps the percentage's two decimal places, so exports print 37.50, not 37.5000.
+    return Decimal(profit) * Decimal(basis_points).scaleb(-2) / Decimal(100)
+
+
+def partner_shares(total_profit, partners=None) -> list:
+    """Split a profit between partners (all of them unless given) by their percentage."""
+    partners = Partner.objects.all() if partners is None else partners
+    return [
+        {"partner": partner, "share": _share(int(total_profit), _basis_points(partner.percentage))}
+        for partner in partners
+    ]
+
+
+PERIOD_LENGTHS = {"month": 1, "quarter": 3, "half": 6, "year": 12}
+
+
+def year_periods(year: int, length: str = "month") -> list:
+    """Consecutive (label, first day, last day) periods covering `year`."""
+    months = PERIOD_LENGTHS[length]
+    periods = []
+    for start_month in range(1, 13, months):
+        end_month = start_month + months - 1
+        start = datetime.date(year, start_month, 1)
+        end = datetime.date(year, end_month, calendar.monthrange(year, end_month)[1])
+        label = start.strftime("%Y-%m") if months == 1 else f"{start:%Y-%m}..{end:%Y-%m}"
+        periods.append((label, start, end))
+    return periods
+
+
+def period_profits(periods) -> list:
+    """Ingoing/outgoing/profit for each (label, start, end) period with one grouped rollup query.
+
+    Periods must not overlap; a day that falls in several is counted in the first.
+    """
+    totals = [empty_totals() for _ in periods]
+    if not periods:
+        return totals
+    index = Case(
+        *[When(date__range=(start, end), then=Value(i)) for i, (_, start, end) in enumerate(periods)],
+        default=Value(-1),
+        output_field=IntegerField(),
+    )
+    rows = (
+        DailyOrderStat.objects
+        .filter(date__gte=min(start for _, start, _ in periods), date__lte=max(end for _, _, end in periods))
+        .order_by()
+        .annotate(period=index)
+        .filter(period__gte=0)
+        .values("period")
+        .annotate(**{field: Sum(field) for field in STAT_FIELDS})
+    )
+    for row in rows:
+        totals[row.pop("period")] = _with_profit(row)
+    return totals
+
+
+def partner_statement(periods) -> dict:
+    """Every partner's share of the profit of every period.
+
+    Costs two queries (the grouped rollup and the partner list) whatever the number
+    of periods and partners; the split itself is integer arithmetic on the grid.
+    """
+    profits = [row["total_profit"] for row in period_profits(periods)]
+    partners = list(Partner.objects.all())
+    rows = []
+    for partner in partners:
+        basis_points = _basis_points(partner.percentage)
+        shares = [_share(profit, basis_points) for profit in profits]
+        rows.append({"partner": partner, "shares": shares, "total": _share(sum(profits), basis_points)})
+    return {
+        "periods": [
+            {"label": label, "start": start, "end": end, "profit": profit}
+            for (label, start, end), profit in zip(periods, profits)
+        ],
+        "partners": rows,
+        "total_profit": sum(profits),
+    }
@@ -1,3 +1,893 @@
-from django.test import TestCase
+"""Tests for the core app: query-count and time-budget regressions, and behaviour.
 
-# Create your tests here.
+The performance tests seed data with core.benchmarks.seed (the same generator
+``bench_views`` uses). Query counts are exact: a change that adds a query, or
+an N+1 that only shows up with more rows, fails here rather than in production.
+The behaviour tests (signals, rollup, archive, import, API, facets...) run on
+the small FIXTURE_ORDERS set, where expected results can be checked by hand.
+"""
+import datetime
+import gzip
+import json
+import os
+import re
+import tempfile
+import time
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+from django.utils import timezone
+
+from . import bulk, customers, facets, jobs, rollup, views
+from .activity import ActivityLogMiddleware, log_activity
+from .benchmarks import seed
+from .forms import OrderForm
+from .models import Order, Partner, ArchivedOrder, ArchivedYear, Job, Customer, ChangeEvent, ActivityLog
+from .logarchive import archive_logs
+from .orderarchive import ClosedYearError, archive_year
+from .pagination import encode_cursor, paginate_keyset
+from .resultcache import CACHE_ALIAS
+from .stats import order_stats
+
+
+# Every authenticated request loads the session and the user: 2 queries.
+# Views behind data_condition also read the DataVersion rows: 1 query.
+QUERY_COUNTS = [
+    ("/", 6),
+    ("/dashboard/series/?bucket=month", 3),
+    ("/dashboard/export/", 6),
+    ("/orders/", 6),
+    ("/orders/?order_type=IN", 6),
+    ("/orders/?date_from=2025-01-01&date_to=2025-03-01", 6),
+    ("/orders/?price_min=100000&sort_by=price", 5),
+    ("/orders/?sort_by=name", 6),
+    ("/orders/?search=%D8%AD%D8%AF%D9%8A%D8%AF", 5),
+    ("/orders/?archive=on", 6),
+    ("/orders/?customer=1", 5),
+    ("/customers/", 4),
+    ("/customers/?search=%D8%A7%D9%84%D8%AC%D8%A8%D9%88%D8%B1%D9%8A&sort_by=-num_orders", 4),
+    ("/logs/", 5),
+    ("/logs/?action=UPDATE", 5),
+    ("/partners/", 4),
+    ("/partners/statement/?year=2025", 6),
+    ("/api/orders/", 3),
+    ("/api/partners/", 3),
+]
+
+# Best-of-three wall-clock budgets in seconds on TIME_BUDGET_ORDERS orders.
+# They are several times the measured time, to catch a change of complexity
+# (a scan of Order instead of the rollup, per-row queries) rather than noise.
+TIME_BUDGET_ORDERS = 5000
+TIME_BUDGETS = [
+    ("/", 0.25),
+    ("/?date_from=2025-01-01&date_to=2025-06-30", 0.25),
+    ("/dashboard/series/?bucket=day", 0.25),
+    ("/dashboard/series/?bucket=month", 0.25),
+    ("/partners/statement/?year=2025", 0.25),
+    ("/orders/", 0.25),
+    ("/dashboard/export/", 2.0),
+]
+
+
+# The seeded orders span the three years up to this day, so the fixed 2025 URLs above match data.
+SEED_END = datetime.date(2025, 12, 31)
+
+# Small hand-written data set for the functional tests: (name, type, price, date, customer name, address).
+FIXTURE_ORDERS = [
+    ("حديد 1", Order.INGOING, 50_000, datetime.date(2023, 5, 10), "أحمد علي", "بغداد"),
+    ("اسمنت", Order.OUTGOING, 120_000, datetime.date(2023, 11, 2), "احمد علي", "البصرة"),
+    ("حديد 2", Order.INGOING, 300_000, datetime.date(2025, 1, 15), "Sara", "Erbil"),
+    ("خشب", Order.OUTGOING, 80_000, datetime.date(2025, 1, 20), "sara", ""),
+    ("حديد 3", None, 600_000, datetime.date(2025, 2, 3), "", "Basra"),
+    ("رمل", Order.INGOING, 1_500_000, datetime.date(2025, 3, 28), "Omar", "Mosul"),
+    ("طابوق", Order.OUTGOING, 250_000, datetime.date(2025, 3, 30), "Omar", "Mosul"),
+]
+
+
+def _without_csrf_tokens(content: bytes) -> bytes:
+    # Every render masks the CSRF token differently.
+    return re.sub(rb'name="csrfmiddlewaretoken" value="[^"]*"', b"", content)
+
+
+def _get(client, url):
+    response = client.get(url)
+    if getattr(response, "streaming", False):
+        b"".join(response.streaming_content)
+    return response
+
+
+class ViewPerformanceTestCase(TestCase):
+    orders = 300
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("perf")
+        seed(cls.orders, user=cls.user, end=SEED_END)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # Every request computes its results instead of reading them from the dashboard cache.
+        caches[CACHE_ALIAS].clear()
+
+    def count_queries(self, url) -> int:
+        caches[CACHE_ALIAS].clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = _get(self.client, url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+
+class FixtureTestCase(TestCase):
+    """A logged-in user and FIXTURE_ORDERS, saved one at a time through the signal handlers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("fixture")
+        cls.orders = {
+            name: Order.objects.create(name=name, order_type=order_type, price=price, date=date, customer_name=customer, customer_address=address)
+            for name, order_type, price, date, customer, address in FIXTURE_ORDERS
+        }
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        caches[CACHE_ALIAS].clear()
+
+    def queries(self, url) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(_get(self.client, url).status_code, 200, url)
+        return len(queries)
+
+
+class OrderSignalTests(TestCase):
+    def create(self, **fields):
+        values = {"name": "Order", "order_type": Order.INGOING, "price": 100, "date": datetime.date(2025, 1, 10)}
+        return Order.objects.create(**{**values, **fields})
+
+    def test_edits_and_deletes_keep_the_rollup_exact(self):
+        order = self.create()
+        other = self.create(order_type=Order.OUTGOING, price=40)
+        order.date = datetime.date(2025, 2, 3)
+        order.save()
+        order.order_type = None
+        order.save()
+        order.price = 250
+        order.order_type = Order.OUTGOING
+        order.save()
+        other.delete()
+        self.assertEqual(rollup.verify(), [])
+        self.assertEqual(order_stats()["totals"]["total_outgoing"], 250)
+        self.assertEqual(
+            list(ChangeEvent.objects.values_list("action", flat=True)),
+            [ChangeEvent.CREATE, ChangeEvent.CREATE] + [ChangeEvent.UPDATE] * 3 + [ChangeEvent.DELETE],
+        )
+
+    def test_a_failing_bookkeeping_step_rolls_the_write_back(self):
+        order = self.create()
+        with mock.patch("core.changes.record", side_effect=OperationalError("database is locked")):
+            with self.assertRaises(OperationalError):
+                self.create(price=999)
+            order.price = 5
+            with self.assertRaises(OperationalError):
+                order.save()
+            with self.assertRaises(OperationalError):
+                order.delete()
+        self.assertEqual(list(Order.objects.values_list("price", flat=True)), [100])
+        self.assertEqual(rollup.verify(), [])
+        self.assertEqual(ChangeEvent.objects.count(), 1)
+
+    def test_partner_writes_and_their_change_events_commit_together(self):
+        partner = Partner.objects.create(name="P", joined_amount=1, percentage=10)
+        with mock.patch("core.changes.record", side_effect=OperationalError("database is locked")):
+            partner.percentage = 20
+            with self.assertRaises(OperationalError):
+                partner.save()
+            with self.assertRaises(OperationalError):
+                partner.delete()
+        self.assertEqual(Partner.objects.get().percentage, 10)
+        self.assertEqual(list(ChangeEvent.objects.values_list("model_name", "action")), [("partner", ChangeEvent.CREATE)])
+
+
+class DashboardExportTests(TestCase):
+    def test_partner_shares_keep_the_percentage_precision(self):
+        user = User.objects.create_user("export")
+        self.client.force_login(user)
+        Partner.objects.create(name="Ali", joined_amount=1, percentage=Decimal("37.50"))
+        Partner.objects.create(name="Omar", joined_amount=1, percentage=Decimal("33.33"))
+        Order.objects.create(name="In", order_type=Order.INGOING, price=1000, date=datetime.date(2025, 1, 10))
+        Order.objects.create(name="Out", order_type=Order.OUTGOING, price=200, date=datetime.date(2025, 1, 11))
+        response = self.client.get("/dashboard/export/")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        start = lines.index("Partner Shares (from profit)")
+        self.assertEqual(lines[start:start + 5], [
+            "Partner Shares (from profit)",
+            "Partner,Percentage,Share Amount",
+            "Ali,37.50%,300.00",
+            "Omar,33.33%,266.64",
+            "",
+        ])
+
+
+class TamperedCursorTests(TestCase):
+    CURSORS = [{"v": "garbage", "pk": 1}, {"v": "2025-01-01", "pk": "abc"}, {"v": None, "pk": 1}, {"v": ["2025-01-01"], "pk": 1}]
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("cursor"))
+        Order.objects.create(name="A", order_type=Order.INGOING, price=1, date=datetime.date(2025, 1, 1))
+
+    def test_api_rejects_tampered_cursors(self):
+        for values in self.CURSORS:
+            with self.subTest(**values):
+                response = self.client.get("/api/orders/", {"cursor": encode_cursor(values)})
+                self.assertEqual(response.status_code, 400)
+
+    def test_invalid_page_sizes_fall_back_to_the_default(self):
+        for per_page in ("-5", "0", "abc", "7"):
+            with self.subTest(per_page=per_page):
+                response = self.client.get("/orders/", {"per_page": per_page})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context["per_page"], 10)
+        self.assertEqual(self.client.get("/orders/", {"per_page": "25"}).context["per_page"], 25)
+
+    def test_lists_fall_back_to_the_first_page(self):
+        for values in self.CURSORS:
+            with self.subTest(**values):
+                for url in ("/orders/", "/logs/"):
+                    self.assertEqual(self.client.get(url, {"cursor": encode_cursor(values)}).status_code, 200)
+
+
+@override_settings(ACTIVITY_LOG_MODE="request")
+class ActivityLogMiddlewareTests(TestCase):
+    def test_request_entries_are_written_once_the_response_is_closed(self):
+        def view(request):
+            log_activity(request, ActivityLog.CREATE, model_name="Order", object_id=1, object_repr="A")
+            log_activity(request, ActivityLog.UPDATE, model_name="Order", object_id=1, object_repr="A")
+            return HttpResponse("ok")
+
+        request = RequestFactory().get("/")
+        request.user = User.objects.create_user("logger")
+        response = ActivityLogMiddleware(view)(request)
+        self.assertFalse(ActivityLog.objects.exists())
+        response.close()
+        self.assertEqual(list(ActivityLog.objects.order_by("id").values_list("action", flat=True)), [ActivityLog.CREATE, ActivityLog.UPDATE])
+
+    def test_entries_are_written_when_the_view_raises(self):
+        def view(request):
+            log_activity(request, ActivityLog.DELETE, model_name="Order", object_id=1, object_repr="A")
+            raise RuntimeError("boom")
+
+        request = RequestFactory().get("/")
+        request.user = User.objects.create_user("logger")
+        with self.assertRaises(RuntimeError):
+            ActivityLogMiddleware(view)(request)
+        self.assertEqual(ActivityLog.objects.count(), 1)
+
+
+class LogArchiveTests(TestCase):
+    def setUp(self):
+        old = timezone.now() - datetime.timedelta(days=400)
+        ActivityLog.objects.bulk_create([
+            ActivityLog(timestamp=old, action=ActivityLog.CREATE, model_name="Order", object_id=i, object_repr=f"#{i}")
+            for i in range(5)
+        ])
+        self.cutoff = timezone.now() - datetime.timedelta(days=365)
+        handle, self.path = tempfile.mkstemp(suffix=".jsonl.gz")
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def archived_ids(self) -> list:
+        with gzip.open(self.path, "rt", encoding="utf-8") as archive:
+            return [json.loads(line)["object_id"] for line in archive]
+
+    def test_file_mode_moves_every_batch(self):
+        self.assertEqual(archive_logs(self.cutoff, batch_size=2, path=self.path), 5)
+        self.assertEqual(self.archived_ids(), [0, 1, 2, 3, 4])
+        self.assertFalse(ActivityLog.objects.exists())
+
+    def test_a_failed_batch_keeps_its_rows_and_the_written_ones(self):
+        with mock.patch("core.logarchive.versioning.bump", side_effect=[None, OperationalError("disk I/O error")]):
+            with self.assertRaises(OperationalError):
+                archive_logs(self.cutoff, batch_size=2, path=self.path)
+        self.assertEqual(list(ActivityLog.objects.order_by("object_id").values_list("object_id", flat=True)), [2, 3, 4])
+        self.assertEqual(self.archived_ids(), [0, 1, 2, 3])
+
+
+class OrderBulkActionTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("bulk"))
+        Order.objects.create(name="Old", order_type=Order.INGOING, price=1, date=datetime.date(2024, 6, 1))
+        archive_year(2024)
+        self.order = Order.objects.create(name="New", order_type=Order.INGOING, price=1, date=datetime.date(2025, 1, 5))
+
+    def post(self, **data):
+        return self.client.post("/orders/bulk/", {"next": "/orders/", **data}, follow=True)
+
+    def test_a_shift_into_an_archived_year_is_reported(self):
+        self.client.get("/orders/")  # sets the CSRF cookie, which is part of the ETag
+        etag = self.client.get("/orders/")["ETag"]
+        self.client.post("/orders/bulk/", {"next": "/orders/", "ids": str(self.order.pk), "action": "shift_date", "days": -30})
+        # Nothing changed, but the page must still be rendered to show the message.
+        response = self.client.get("/orders/", HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "لا يمكن نقل الطلبات إلى سنة مؤرشفة")
+        self.assertEqual(self.client.get("/orders/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).date, datetime.date(2025, 1, 5))
+
+    def test_an_invalid_form_is_reported(self):
+        response = self.post(action="shift_date", days=3)
+        self.assertContains(response, "اختر طلباً واحداً على الأقل")
+        response = self.post(ids=str(self.order.pk), action="shift_date")
+        self.assertContains(response, "أدخل عدد الأيام")
+
+    def test_actions_apply_to_the_selected_orders(self):
+        self.post(ids=str(self.order.pk), action="shift_date", days=3)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).date, datetime.date(2025, 1, 8))
+        self.post(ids=str(self.order.pk), action="set_type", order_type=Order.OUTGOING)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).order_type, Order.OUTGOING)
+        self.post(ids=str(self.order.pk), action="delete")
+        self.assertFalse(Order.objects.filter(pk=self.order.pk).exists())
+        self.assertEqual(rollup.verify(), [])
+
+    def test_a_bulk_delete_is_accounted_for_once(self):
+        other = Order.objects.create(name="Other", order_type=Order.OUTGOING, price=2, date=datetime.date(2025, 1, 5))
+        kept = Order.objects.create(name="Kept", price=3, date=datetime.date(2025, 1, 5))
+        ChangeEvent.objects.all().delete()
+        self.post(ids=[self.order.pk, other.pk], action="delete")
+        self.assertEqual(rollup.verify(), [])
+        self.assertEqual(ChangeEvent.objects.filter(action=ChangeEvent.DELETE).count(), 2)
+        # Outside the bulk action, post_delete keeps the rollup up to date again.
+        kept.delete()
+        self.assertEqual(rollup.verify(), [])
+
+
+class OrderImportTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("importer"))
+
+    def upload(self, content: bytes, name: str = "orders.csv"):
+        return self.client.post("/orders/import/", {"file": SimpleUploadedFile(name, content, content_type="text/csv")})
+
+    def test_invalid_rows_are_reported_and_the_rest_imported(self):
+        Order.objects.create(name="Old", order_type=Order.INGOING, price=1, date=datetime.date(2023, 3, 1))
+        archive_year(2023)
+        content = (
+            "name,order_type,price,date,customer_name\n"
+            "Steel,Ingoing,\"1,500\",2025-01-02,Ali\n"
+            "Bad price,IN,abc,2025-01-03,\n"
+            "Bad date,OUT,10,2025-13-01,\n"
+            "Closed,OUT,10,2023-05-01,\n"
+            "Wood,out,20,2025-01-04,ali\n"
+        )
+        response = self.upload(content.encode())
+        result = response.context["result"]
+        self.assertEqual((result.created, result.rejected), (2, 3))
+        self.assertEqual([line for line, _ in result.errors], [3, 4, 5])
+        self.assertTrue(result.errors[0][1].startswith("price:"))
+        self.assertTrue(result.errors[2][1].startswith("date:"))
+
+        steel, wood = Order.objects.filter(date__year=2025).order_by("date")
+        self.assertEqual((steel.price, steel.order_type, wood.order_type), (1500, Order.INGOING, Order.OUTGOING))
+        self.assertEqual(steel.customer_id, wood.customer_id)
+        self.assertEqual(rollup.verify(), [])
+        self.assertEqual(ActivityLog.objects.get().details, result.summary())
+
+    def test_a_missing_column_rejects_the_file(self):
+        result = self.upload(b"name,price\nSteel,10\n").context["result"]
+        self.assertEqual(result.errors, [(1, "missing column(s): date")])
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(ActivityLog.objects.exists())
+
+    def test_an_undecodable_file_is_reported(self):
+        response = self.upload(b"name,price,date\n\xff\xfe,1,2025-01-01\n")
+        self.assertEqual(response.status_code, 200)
+        result = response.context["result"]
+        self.assertEqual((result.created, result.rejected), (0, 1))
+        self.assertIn("unreadable file", result.errors[0][1])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("pages"))
+        # Repeated prices: the pk breaks the ties.
+        for i, price in enumerate([5, 5, 5, 3, 3, 9, 1, 5]):
+            Order.objects.create(name=f"O{i}", order_type=Order.INGOING, price=price, date=datetime.date(2025, 1, 1 + i))
+        self.by_price = list(Order.objects.order_by("price", "pk").values_list("pk", flat=True))
+
+    def test_next_and_previous_pages_cover_every_row_once(self):
+        page = paginate_keyset(Order.objects.all(), "price", 3)
+        pages = [[order.pk for order in page]]
+        self.assertFalse(page.has_previous)
+        while page.has_next:
+            page = paginate_keyset(Order.objects.all(), "price", 3, page.next_cursor)
+            pages.append([order.pk for order in page])
+        self.assertEqual(pages, [self.by_price[0:3], self.by_price[3:6], self.by_price[6:8]])
+
+        backwards = []
+        while page.has_previous:
+            page = paginate_keyset(Order.objects.all(), "price", 3, page.previous_cursor)
+            backwards.insert(0, [order.pk for order in page])
+        self.assertEqual(backwards, pages[:2])
+        self.assertTrue(page.has_next)
+
+    def test_api_and_list_follow_their_cursors(self):
+        seen, cursor = [], None
+        while True:
+            params = {"sort_by": "-price", "limit": 3, "fields": "id"}
+            if cursor:
+                params["cursor"] = cursor
+            data = self.client.get("/api/orders/", params).json()
+            seen += [row["id"] for row in data["results"]]
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.by_price[::-1])
+
+        for price in (2, 4, 5, 7):
+            Order.objects.create(name="More", order_type=Order.OUTGOING, price=price, date=datetime.date(2025, 2, 1))
+        by_price = list(Order.objects.order_by("price", "pk").values_list("pk", flat=True))
+        first = self.client.get("/orders/", {"sort_by": "price", "per_page": 10}).context["orders"]
+        second = self.client.get("/orders/", {"sort_by": "price", "per_page": 10, "cursor": first.next_cursor}).context["orders"]
+        self.assertEqual([order.pk for order in list(first) + list(second)], by_price)
+        back = self.client.get("/orders/", {"sort_by": "price", "per_page": 10, "cursor": second.previous_cursor}).context["orders"]
+        self.assertEqual([order.pk for order in back], by_price[:10])
+
+
+class CacheInvalidationTests(FixtureTestCase):
+    def dashboard(self, **params):
+        return self.client.get("/", params).context
+
+    def test_writes_refresh_the_cached_dashboard(self):
+        self.assertEqual(self.dashboard()["total_profit"], 1_400_000)
+        self.assertEqual(self.dashboard()["total_profit"], 1_400_000)  # from the cache
+
+        Order.objects.create(name="New", order_type=Order.INGOING, price=100_000, date=datetime.date(2025, 4, 1))
+        self.assertEqual(self.dashboard()["total_profit"], 1_500_000)
+
+        bulk.bulk_set_type(RequestFactory().post("/"), [self.orders["رمل"].pk], Order.OUTGOING)
+        self.assertEqual(self.dashboard()["total_profit"], -1_500_000)
+        self.assertEqual(self.dashboard(date_from="2025-04-01")["total_profit"], 100_000)
+
+    def test_partner_edits_refresh_the_shares(self):
+        partner = Partner.objects.create(name="Ali", joined_amount=1, percentage=10)
+        self.assertEqual(self.dashboard()["partner_rows"][0]["share"], Decimal("140000.00"))
+        partner.percentage = Decimal("20")
+        partner.save()
+        self.assertEqual(self.dashboard()["partner_rows"][0]["share"], Decimal("280000.00"))
+
+
+class OrderApiTests(FixtureTestCase):
+    def send(self, method, url, body=None):
+        return getattr(self.client, method)(url, body or {}, content_type="application/json")
+
+    def test_writes_validate_log_and_update_the_rollup(self):
+        response = self.send("post", "/api/orders/", {"name": "API", "order_type": Order.INGOING, "price": "many", "date": "2025-13-01"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()["errors"]), {"price", "date"})
+
+        response = self.send("post", "/api/orders/", {"name": "API", "order_type": Order.INGOING, "price": 5, "date": "2025-05-01"})
+        self.assertEqual(response.status_code, 201)
+        url = f"/api/orders/{response.json()['id']}/"
+        self.assertEqual(self.send("patch", url, {"price": 7}).json()["price"], 7)
+        self.assertEqual(self.client.get(url).json()["price"], 7)
+        self.assertEqual(self.client.delete(url).json(), {"deleted": True})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.assertEqual(rollup.verify(), [])
+        self.assertEqual(list(ActivityLog.objects.order_by("id").values_list("action", flat=True)), [ActivityLog.CREATE, ActivityLog.UPDATE, ActivityLog.DELETE])
+
+    def test_requests_need_a_login_and_known_methods(self):
+        self.assertEqual(self.client.put("/api/orders/").status_code, 405)
+        self.client.logout()
+        self.assertEqual(self.client.get("/api/orders/").status_code, 401)
+        self.assertEqual(self.send("post", "/api/partners/", {"name": "X", "joined_amount": 1, "percentage": 5}).status_code, 401)
+        self.assertFalse(Partner.objects.exists())
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("feed"))
+
+    def feed(self, **params):
+        return self.client.get("/api/changes/", params).json()
+
+    def test_clients_catch_up_from_their_last_sequence(self):
+        order = Order.objects.create(name="A", order_type=Order.INGOING, price=1, date=datetime.date(2025, 1, 1))
+        partner = Partner.objects.create(name="P", joined_amount=1, percentage=5)
+        order.price = 2
+        order.save()
+
+        data = self.feed(limit=2)
+        self.assertEqual([(c["model"], c["id"], c["action"]) for c in data["changes"]], [("order", order.pk, ChangeEvent.CREATE), ("partner", partner.pk, ChangeEvent.CREATE)])
+        self.assertEqual(data["changes"][0]["data"]["price"], 2)  # the current row, not the one at the time
+        self.assertTrue(data["has_more"])
+
+        data = self.feed(since=data["next_since"])
+        self.assertEqual([c["action"] for c in data["changes"]], [ChangeEvent.UPDATE])
+        self.assertFalse(data["has_more"])
+        since = data["next_since"]
+
+        order.delete()
+        data = self.feed(since=since, models="order")
+        self.assertEqual([(c["action"], c["data"]) for c in data["changes"]], [(ChangeEvent.DELETE, None)])
+        self.assertEqual(self.feed(since=data["next_since"]), {"changes": [], "next_since": data["next_since"], "has_more": False})
+        self.assertEqual(self.client.get("/api/changes/", {"models": "user"}).status_code, 400)
+
+
+class QueryCountTests(ViewPerformanceTestCase):
+    def test_exact_query_counts(self):
+        for url, expected in QUERY_COUNTS:
+            with self.subTest(url=url):
+                caches[CACHE_ALIAS].clear()
+                with self.assertNumQueries(expected):
+                    self.assertEqual(_get(self.client, url).status_code, 200)
+
+    def test_cached_dashboard_skips_the_aggregates(self):
+        _get(self.client, "/")
+        with self.assertNumQueries(4):
+            self.client.get("/")
+
+    def test_archived_year_keeps_query_counts(self):
+        archive_year(Order.objects.earliest("date").date.year)
+        for url in ("/", "/orders/", "/orders/?archive=on", "/dashboard/export/"):
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), dict(QUERY_COUNTS)[url])
+
+    def test_not_modified_costs_only_the_version_check(self):
+        self.client.get("/orders/")  # sets the CSRF cookie, which is part of the ETag
+        response = self.client.get("/orders/")
+        with self.assertNumQueries(3):
+            response = self.client.get("/orders/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+
+class QueryGrowthTests(ViewPerformanceTestCase):
+    orders = 100
+
+    def test_query_count_does_not_grow_with_rows(self):
+        before = {url: self.count_queries(url) for url, _ in QUERY_COUNTS}
+
+        seed(2000, partners=0, user=self.user, rng_seed=2, end=SEED_END)
+        for i in range(10):
+            Partner.objects.create(name=f"Partner {i}", joined_amount=1_000_000, percentage=1)
+        Order.objects.create(name="Edited", order_type=Order.INGOING, price=1, date=datetime.date(2025, 1, 15))
+
+        for url, _ in QUERY_COUNTS:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), before[url])
+
+
+class TimeBudgetTests(ViewPerformanceTestCase):
+    orders = TIME_BUDGET_ORDERS
+
+    def best_of(self, url, runs=3) -> float:
+        timings = []
+        for _ in range(runs):
+            caches[CACHE_ALIAS].clear()
+            started = time.perf_counter()
+            response = _get(self.client, url)
+            timings.append(time.perf_counter() - started)
+            self.assertEqual(response.status_code, 200, url)
+        return min(timings)
+
+    def test_aggregate_and_export_budgets(self):
+        _get(self.client, "/")  # load templates and the connection outside the timings
+        for url, budget in TIME_BUDGETS:
+            with self.subTest(url=url):
+                elapsed = self.best_of(url)
+                self.assertLess(elapsed, budget, f"{url} took {elapsed:.3f}s, budget {budget}s")
+
+
+class OrderArchiveTests(FixtureTestCase):
+    def test_archiving_moves_the_year_and_keeps_totals(self):
+        before = order_stats(bucket="month")
+        self.assertEqual(archive_year(2023), 2)
+        self.assertFalse(Order.objects.filter(date__year=2023).exists())
+        self.assertEqual(set(ArchivedOrder.objects.values_list("name", flat=True)), {"حديد 1", "اسمنت"})
+        self.assertEqual(ArchivedYear.objects.get(year=2023).num_orders, 2)
+        self.assertEqual(order_stats(bucket="month"), before)
+        self.assertEqual(rollup.verify(), [])
+        rollup.rebuild()
+        self.assertEqual(order_stats(bucket="month"), before)
+
+    def test_orders_list_counts_and_searches_the_archive(self):
+        archive_year(2023)
+        response = self.client.get("/orders/")
+        self.assertEqual((response.context["total_count"], response.context["archived_count"]), (5, 2))
+
+        response = self.client.get("/orders/", {"archive": "on"})
+        self.assertEqual(response.context["total_count"], 2)
+        self.assertEqual({order.name for order in response.context["orders"]}, {"حديد 1", "اسمنت"})
+        response = self.client.get("/orders/", {"archive": "on", "search": "حديد"})
+        self.assertEqual([order.name for order in response.context["orders"]], ["حديد 1"])
+
+    def test_archived_year_is_closed(self):
+        archive_year(2023)
+        with self.assertRaises(ClosedYearError):
+            archive_year(2023)
+        form = OrderForm({"name": "Late", "order_type": Order.INGOING, "price": 1, "date": "2023-06-01"})
+        self.assertIn("date", form.errors)
+
+    def test_admin_edits_cannot_move_orders_into_an_archived_year(self):
+        archive_year(2023)
+        self.client.force_login(User.objects.create_superuser("admin"))
+        order = self.orders["رمل"]
+        data = {"name": order.name, "order_type": order.order_type, "price": order.price, "date": "2023-06-01",
+                "description": "", "customer_name": order.customer_name, "customer_address": order.customer_address}
+        response = self.client.post(f"/admin/core/order/{order.pk}/change/", data)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("date", response.context["adminform"].form.errors)
+        self.assertEqual(Order.objects.get(pk=order.pk).date, datetime.date(2025, 3, 28))
+        self.assertEqual(rollup.verify(), [])
+
+
+class CustomerTests(FixtureTestCase):
+    def test_spellings_of_one_name_share_a_customer(self):
+        first = self.orders["حديد 1"]
+        second = Order.objects.get(name="اسمنت")
+        self.assertEqual(first.customer_id, second.customer_id)
+        self.assertEqual(first.customer.address, "بغداد")
+        self.assertIsNone(self.orders["حديد 3"].customer_id)
+
+        second.customer_name = "Sara"
+        second.save()
+        self.assertEqual(Order.objects.get(pk=second.pk).customer_id, self.orders["خشب"].customer_id)
+        self.assertEqual(customers.normalize_name(" SARA "), Customer.objects.get(pk=second.customer_id).key)
+
+    def test_bulk_linking_matches_saving_one_by_one(self):
+        batch = [Order(customer_name=name) for name in ("omar ", "New  Name", "new name", "")]
+        customers.link_all(batch)
+        omar = self.orders["رمل"].customer_id
+        self.assertEqual(batch[0].customer_id, omar)
+        self.assertEqual(batch[1].customer_id, batch[2].customer_id)
+        self.assertEqual(Customer.objects.get(pk=batch[1].customer_id).name, "New Name")
+        self.assertIsNone(batch[3].customer_id)
+        self.assertEqual(Customer.objects.count(), 4)
+
+    def test_customer_totals_match_the_orders(self):
+        rows = {row["customer__name"]: row for row in customers.customer_totals(sort="name")}
+        self.assertEqual(set(rows), {"أحمد علي", "Sara", "Omar"})
+        omar = rows["Omar"]
+        self.assertEqual((omar["num_orders"], omar["total_ingoing"], omar["total_outgoing"], omar["total_profit"]), (2, 1_500_000, 250_000, 1_250_000))
+        self.assertEqual(omar["last_date"], datetime.date(2025, 3, 30))
+        self.assertEqual(rows["أحمد علي"]["total_profit"], -70_000)
+
+        rows = customers.customer_totals(date_from=datetime.date(2025, 1, 1), sort="-total_ingoing")
+        self.assertEqual([row["customer__name"] for row in rows], ["Omar", "Sara"])
+
+        response = self.client.get("/orders/", {"customer": omar["customer"]})
+        self.assertEqual({order.name for order in response.context["orders"]}, {"رمل", "طابوق"})
+
+
+class CustomerSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("search")
+        self.client.force_login(self.user)
+        day = datetime.date(2025, 1, 1)
+        self.baghdad = Order.objects.create(name="A", price=1, date=day, customer_name="Ali", customer_address="Baghdad")
+        self.basra = Order.objects.create(name="B", price=2, date=day, customer_name="ali", customer_address="Basra")
+        self.nameless = Order.objects.create(name="C", price=3, date=day, customer_address="Basra")
+
+    def found(self, term) -> set:
+        response = self.client.get("/orders/", {"customer_search": term})
+        return {order.pk for order in response.context["orders"]}
+
+    def test_addresses_are_matched_per_order(self):
+        self.assertEqual(self.basra.customer_id, self.baghdad.customer_id)
+        self.assertEqual(self.found("Basra"), {self.basra.pk, self.nameless.pk})
+        self.assertEqual(self.found("Bas"), {self.basra.pk, self.nameless.pk})
+        self.assertEqual(self.found("ALI"), {self.baghdad.pk, self.basra.pk})
+
+    def test_out_of_range_customer_ids_are_rejected(self):
+        response = self.client.get("/orders/", {"customer": "99999999999999999999"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("customer", response.context["filter_form"].errors)
+        response = self.client.get("/api/orders/", {"customer": "99999999999999999999"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("customer", response.json()["errors"])
+        self.assertEqual(self.client.get("/orders/", {"customer": str(2**63 - 1)}).status_code, 200)
+
+    def test_customer_edits_invalidate_the_order_list(self):
+        response = self.client.get("/orders/")
+        customer = Customer.objects.get()
+        customer.name = "Ali Hasan"
+        customer.save()
+        self.assertEqual(self.client.get("/orders/", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+        response = self.client.get("/customers/")
+        customer.delete()
+        self.assertEqual(self.client.get("/customers/", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+
+
+class OrderFacetTests(FixtureTestCase):
+    def test_facets_count_each_value(self):
+        response = self.client.get("/orders/", {"order_type": Order.INGOING, "price_min": 100000})
+        counts = facets.order_facets(Order.objects.filter(price__gte=100000), Order.INGOING)
+        self.assertEqual(counts["types"], {Order.INGOING: 2, Order.OUTGOING: 2, "": 1})
+        self.assertEqual(counts["months"], [
+            (datetime.date(2025, 3, 1), datetime.date(2025, 3, 31), 1),
+            (datetime.date(2025, 1, 1), datetime.date(2025, 1, 31), 1),
+        ])
+        self.assertEqual([count for _, _, count in counts["prices"]], [0, 0, 1, 0, 1])
+        self.assertEqual(counts["total"], 2)
+        self.assertEqual(response.context["total_count"], 2)
+        self.assertIn("(2)", dict(response.context["filter_form"].fields["order_type"].choices)[Order.OUTGOING])
+        self.assertContains(response, "حسب السعر")
+
+    def test_facets_are_cached_per_filter_signature(self):
+        url = "/orders/?order_type=OUT&sort_by=name"
+        first = self.queries(url)
+        cached = self.queries(url)
+        self.assertLess(cached, first)
+        self.assertEqual(self.queries("/orders/?order_type=OUT&sort_by=price"), cached)
+        Order.objects.create(name="New", order_type=Order.OUTGOING, price=5, date=datetime.date(2025, 2, 1))
+        self.assertEqual(self.queries(url), first)
+
+    def test_rollup_facets_match_the_order_scan(self):
+        unfiltered = facets.rollup_facets()
+        self.assertEqual(unfiltered["types"], {Order.INGOING: 3, Order.OUTGOING: 3, "": 1})
+        self.assertEqual([(first, count) for first, _, count in unfiltered["months"]], [
+            (datetime.date(2025, 3, 1), 2), (datetime.date(2025, 2, 1), 1), (datetime.date(2025, 1, 1), 2),
+            (datetime.date(2023, 11, 1), 1), (datetime.date(2023, 5, 1), 1),
+        ])
+        filters = [
+            {},
+            {"order_type": Order.OUTGOING},
+            {"date_from": datetime.date(2025, 1, 16), "date_to": datetime.date(2025, 3, 29)},
+            {"date_from": datetime.date(2023, 6, 1), "order_type": Order.INGOING},
+        ]
+        for params in filters:
+            with self.subTest(**params):
+                order_type = params.get("order_type")
+                dates = (params.get("date_from"), params.get("date_to"))
+                qs = Order.objects.all()
+                if dates[0]:
+                    qs = qs.filter(date__gte=dates[0])
+                if dates[1]:
+                    qs = qs.filter(date__lte=dates[1])
+                from_rollup = facets.rollup_facets(*dates, order_type)
+                scanned = facets.order_facets(qs, order_type)
+                self.assertIsNone(from_rollup["prices"])
+                for key in ("types", "months", "total"):
+                    self.assertEqual(from_rollup[key], scanned[key])
+
+    def test_extreme_date_ranges_are_counted_like_any_other(self):
+        cases = [
+            ({"date_from": "0001-01-01"}, 7),
+            ({"date_to": "9999-12-31"}, 7),
+            ({"date_from": "1000-01-01", "date_to": "2025-02-01"}, 4),
+            ({"date_from": "0001-01-01", "date_to": "9999-12-31", "price_min": 100000}, 5),
+        ]
+        for params, expected in cases:
+            with self.subTest(**params):
+                started = time.perf_counter()
+                response = self.client.get("/orders/", params)
+                self.assertLess(time.perf_counter() - started, 1.0)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context["total_count"], expected)
+                self.assertEqual(sum(month["count"] for month in response.context["facets"]["months"]), expected)
+
+    def test_unfiltered_list_does_not_scan_orders(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/orders/")
+        grouped = [q["sql"] for q in queries if "GROUP BY" in q["sql"]]
+        self.assertTrue(grouped)
+        self.assertFalse([sql for sql in grouped if '"core_order"' in sql.split("FROM", 1)[1].split("WHERE")[0]])
+        self.assertEqual(response.context["facets"]["total"], 7)
+        self.assertNotContains(response, "حسب السعر")
+
+
+class SignedAmountTests(FixtureTestCase):
+    def test_signed_amount_is_stored_for_every_order(self):
+        amounts = dict(Order.objects.values_list("name", "signed_amount"))
+        self.assertEqual(amounts, {"حديد 1": 50_000, "اسمنت": -120_000, "حديد 2": 300_000, "خشب": -80_000, "حديد 3": 0, "رمل": 1_500_000, "طابوق": -250_000})
+        total = Order.objects.aggregate(profit=Sum("signed_amount"))["profit"]
+        self.assertEqual(total, order_stats()["totals"]["total_profit"])
+
+        order = self.orders["خشب"]
+        order.order_type = Order.INGOING
+        order.save()
+        order.refresh_from_db()
+        self.assertEqual(order.signed_amount, 80_000)
+
+    def test_orders_sort_and_filter_by_signed_amount(self):
+        response = self.client.get("/orders/", {"sort_by": "-signed_amount"})
+        self.assertEqual([order.signed_amount for order in response.context["orders"]], [1_500_000, 300_000, 50_000, 0, -80_000, -120_000, -250_000])
+
+        response = self.client.get("/api/orders/", {"sort_by": "signed_amount", "fields": "id,signed_amount", "limit": 3})
+        self.assertEqual([row["signed_amount"] for row in response.json()["results"]], [-250_000, -120_000, -80_000])
+        self.assertEqual(Order.objects.filter(signed_amount__lt=0).count(), 3)
+
+    def test_api_writes_return_the_stored_signed_amount(self):
+        body = {"name": "API", "order_type": Order.OUTGOING, "price": 40, "date": "2025-03-02"}
+        created = self.client.post("/api/orders/", body, content_type="application/json").json()
+        self.assertEqual(created["signed_amount"], -40)
+        url = f"/api/orders/{created['id']}/"
+        updated = self.client.patch(url, {"order_type": Order.INGOING}, content_type="application/json").json()
+        self.assertEqual(updated["signed_amount"], 40)
+        replaced = self.client.put(url, {**body, "price": 15}, content_type="application/json").json()
+        self.assertEqual(replaced["signed_amount"], -15)
+        self.assertEqual(Order.objects.get(pk=created["id"]).signed_amount, -15)
+
+
+# The URLs as served under ASGI (settings.ASYNC_VIEWS), for AsyncViewTests.
+urlpatterns = [
+    path("", views.dashboard_async, name="dashboard"),
+    path("dashboard/export/", views.dashboard_export_async, name="dashboard_export"),
+    path("", include("amnah_project.urls")),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewTests(ViewPerformanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.async_client.force_login(self.user)
+
+    async def aget(self, url) -> bytes:
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        if response.streaming:
+            return b"".join([chunk async for chunk in response.streaming_content])
+        return response.content
+
+    def test_async_views_match_the_sync_ones(self):
+        for url in ("/?date_from=2025-01-01&date_to=2025-06-30", "/dashboard/export/"):
+            with self.subTest(url=url):
+                with override_settings(ROOT_URLCONF="amnah_project.urls"):
+                    response = self.client.get(url)
+                expected = _without_csrf_tokens(response.getvalue())
+                caches[CACHE_ALIAS].clear()
+                self.assertEqual(_without_csrf_tokens(async_to_sync(self.aget)(url)), expected)
+
+    def test_async_query_counts(self):
+        for url in ("/", "/dashboard/export/"):
+            with self.subTest(url=url):
+                caches[CACHE_ALIAS].clear()
+                with CaptureQueriesContext(connection) as queries:
+                    async_to_sync(self.aget)(url)
+                self.assertEqual(len(queries), dict(QUERY_COUNTS)[url])
+
+
+class JobQueueTests(FixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        output = tempfile.TemporaryDirectory()
+        self.addCleanup(output.cleanup)
+        override = override_settings(JOB_OUTPUT_DIR=output.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_export_job_matches_the_streamed_export(self):
+        response = self.client.post("/dashboard/export/job/", {"date_from": "2025-01-01", "date_to": "2025-06-30"})
+        job = Job.objects.get()
+        self.assertRedirects(response, f"/jobs/{job.pk}/", fetch_redirect_response=False)
+
+        self.assertEqual(jobs.claim("worker-a").pk, job.pk)
+        self.assertIsNone(jobs.claim("worker-b"))
+        job = jobs.run(Job.objects.get(pk=job.pk))
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.progress, job.total)
+
+        streamed = self.client.get("/dashboard/export/?date_from=2025-01-01&date_to=2025-06-30").getvalue()
+        self.assertEqual(self.client.get(f"/jobs/{job.pk}/download/").getvalue(), streamed)
+        self.assertEqual(self.client.get(f"/jobs/{job.pk}/?format=json").json()["percent"], 100)
+
+    def test_stale_jobs_are_requeued_and_old_ones_deleted(self):
+        job = jobs.enqueue(jobs.DASHBOARD_EXPORT, user=self.user)
+        jobs.claim("dead-worker")
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.QUEUED)
+
+        job = jobs.run(jobs.claim("worker-a"))
+        self.assertTrue(os.path.exists(job.result_path))
+        self.assertEqual(jobs.cleanup(retention_hours=1), 0)
+        self.assertEqual(jobs.cleanup(retention_hours=0), 1)
+        self.assertFalse(os.path.exists(job.result_path))
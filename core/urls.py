@@ -1,21 +1,42 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, api
 
 
+# Under ASGI (settings.ASYNC_VIEWS) the dashboard and its export are served by their async versions.
+if settings.ASYNC_VIEWS:
+    dashboard, dashboard_export = views.dashboard_async, views.dashboard_export_async
+else:
+    dashboard, dashboard_export = views.dashboard, views.dashboard_export
+
 urlpatterns = [
-    path("", views.dashboard, name="dashboard"),
-    path("dashboard/export/", views.dashboard_export, name="dashboard_export"),
+    path("", dashboard, name="dashboard"),
+    path("dashboard/export/", dashboard_export, name="dashboard_export"),
+    path("dashboard/export/job/", views.dashboard_export_job, name="dashboard_export_job"),
+    path("dashboard/series/", views.dashboard_series, name="dashboard_series"),
+    path("jobs/<int:pk>/", views.job_detail, name="job_detail"),
+    path("jobs/<int:pk>/download/", views.job_download, name="job_download"),
+    path("dashboard/cache-stats/", views.dashboard_cache_stats, name="dashboard_cache_stats"),
     path("login/", views.login_view, name="login"),
     path("logout/", views.logout_view, name="logout"),
     path("logs/", views.logs_list, name="logs_list"),
+    path("customers/", views.customers_list, name="customers_list"),
     path("orders/", views.orders_list, name="orders_list"),
     path("orders/new/", views.order_create, name="order_create"),
+    path("orders/import/", views.order_import, name="order_import"),
+    path("orders/bulk/", views.order_bulk_action, name="order_bulk_action"),
     path("orders/<int:pk>/edit/", views.order_edit, name="order_edit"),
     path("orders/<int:pk>/delete/", views.order_delete, name="order_delete"),
     path("partners/", views.partners_list, name="partners_list"),
+    path("partners/statement/", views.partners_statement, name="partners_statement"),
     path("partners/new/", views.partner_create, name="partner_create"),
     path("partners/<int:pk>/edit/", views.partner_edit, name="partner_edit"),
     path("partners/<int:pk>/delete/", views.partner_delete, name="partner_delete"),
+    path("api/orders/", api.orders, name="api_orders"),
+    path("api/orders/<int:pk>/", api.order_detail, name="api_order_detail"),
+    path("api/partners/", api.partners, name="api_partners"),
+    path("api/partners/<int:pk>/", api.partner_detail, name="api_partner_detail"),
+    path("api/changes/", api.change_feed, name="api_change_feed"),
 ]
 
 
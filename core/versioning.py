@@ -0,0 +1,24 @@
+"""Global data-version counters.
+
+Every write to Order or Partner bumps a counter row. Anything derived from
+those tables (cached dashboard results, conditional GET validators) includes
+the current versions in its key, so it can never be served stale.
+"""
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DataVersion
+
+
+def bump(*names) -> None:
+    now = timezone.now()
+    for name in names:
+        updated = DataVersion.objects.filter(name=name).update(version=F("version") + 1, updated_at=now)
+        if not updated:
+            DataVersion.objects.get_or_create(name=name, defaults={"version": 1, "updated_at": now})
+
+
+def current(*names) -> dict:
+    """Return {name: (version, updated_at)} for the given counters in one query."""
+    found = {row.name: (row.version, row.updated_at) for row in DataVersion.objects.filter(name__in=names)}
+    return {name: found.get(name, (0, None)) for name in names}
@@ -1,207 +1,282 @@
-from decimal import Decimal
-from django.db.models import Sum, Case, When, F, BigIntegerField
+from django.contrib import messages
 from django.shortcuts import render, redirect
 from django.urls import reverse
 from django.shortcuts import get_object_or_404
 
-from .models import Order, Partner, ActivityLog
-from .forms import OrderForm, PartnerForm, OrderFilterForm, DashboardFilterForm
-from django.http import HttpResponse
-import csv
+from .models import Order, ArchivedOrder, Partner, ActivityLog, DataVersion, Job
+from .conditional import data_condition, request_versions
+from .activity import log_activity
+from .stats import order_stats, rollup_counts, year_periods, BUCKETS
+from .resultcache import dashboard_summary, adashboard_summary, partner_statement, cache_stats, get_or_compute
+from .facets import order_facets, rollup_facets
+from .pagination import paginate_keyset, InvalidCursor
+from .exports import dashboard_rows, adashboard_rows, iter_csv, aiter_csv
+from .importers import import_orders_logged
+from . import bulk, jobs
+from .orderarchive import ClosedYearError
+from .customers import customer_totals
+from .forms import OrderForm, OrderImportForm, OrderBulkActionForm, PartnerForm, PartnerStatementForm, OrderFilterForm, DashboardFilterForm, CustomerFilterForm, ActivityLogFilterForm
+from django.http import JsonResponse, StreamingHttpResponse, FileResponse, Http404
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.contrib.auth import authenticate, login, logout
+from django.utils import timezone
 from django import forms as django_forms
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-
-
-def log_activity(request, action: str, instance=None, *, model_name: str = None, object_id=None, object_repr: str = None, details: str = "") -> None:
-    if instance is not None:
-        model_name = instance.__class__.__name__
-        object_id = getattr(instance, "pk", None)
-        object_repr = str(instance)
-    ActivityLog.objects.create(
-        user=request.user if getattr(request, "user", None) and request.user.is_authenticated else None,
-        action=action,
-        model_name=model_name or "",
-        object_id=object_id or 0,
-        object_repr=object_repr or "",
-        details=details or "",
-    )
+from asgiref.sync import sync_to_async
+from urllib.parse import urlencode
+import io
+
+
+def _dashboard_range(form):
+    if form.is_valid():
+        return form.cleaned_data.get("date_from"), form.cleaned_data.get("date_to")
+    return None, None
+
 
 @login_required
+@data_condition(DataVersion.ORDERS, DataVersion.PARTNERS)
 def dashboard(request):
     form = DashboardFilterForm(request.GET or None)
-
-    qs = Order.objects.all()
-    if form.is_valid():
-        date_from = form.cleaned_data.get("date_from")
-        date_to = form.cleaned_data.get("date_to")
-        if date_from:
-            qs = qs.filter(date__gte=date_from)
-        if date_to:
-            qs = qs.filter(date__lte=date_to)
-
-    totals = qs.aggregate(
-        total_ingoing=Sum(Case(When(order_type=Order.INGOING, then=F("price")), output_field=BigIntegerField())),
-        total_outgoing=Sum(Case(When(order_type=Order.OUTGOING, then=F("price")), output_field=BigIntegerField())),
-    )
-    total_ingoing = totals.get("total_ingoing") or 0
-    total_outgoing = totals.get("total_outgoing") or 0
-    total_profit = total_ingoing - total_outgoing
-
-    num_orders = qs.count()
-    num_ingoing = qs.filter(order_type=Order.INGOING).count()
-    num_outgoing = qs.filter(order_type=Order.OUTGOING).count()
-    from django.db.models import Q
-    num_neutral = qs.filter(Q(order_type__isnull=True) | Q(order_type='')).count()
-
-    partners = list(Partner.objects.all())
-    partner_rows = []
-    for partner in partners:
-        share = (Decimal(total_profit) * (partner.percentage or Decimal("0"))) / Decimal("100")
-        partner_rows.append({
-            "partner": partner,
-            "share": share,
-        })
+    date_from, date_to = _dashboard_range(form)
+    summary = dashboard_summary(date_from, date_to)
 
     context = {
         "filter_form": form,
-        "total_ingoing": total_ingoing,
-        "total_outgoing": total_outgoing,
-        "total_profit": total_profit,
-        "num_orders": num_orders,
-        "num_ingoing": num_ingoing,
-        "num_outgoing": num_outgoing,
-        "num_neutral": num_neutral,
-        "partner_rows": partner_rows,
+        **summary["totals"],
+        "partner_rows": summary["partner_rows"],
     }
     return render(request, "dashboard.html", context)
 
 
+@login_required
+@data_condition(DataVersion.ORDERS, DataVersion.PARTNERS)
+async def dashboard_async(request):
+    """dashboard for ASGI: the totals and the partner list are read concurrently."""
+    form = DashboardFilterForm(request.GET or None)
+    date_from, date_to = _dashboard_range(form)
+    summary = await adashboard_summary(date_from, date_to)
+
+    context = {
+        "filter_form": form,
+        **summary["totals"],
+        "partner_rows": summary["partner_rows"],
+    }
+    return await sync_to_async(render)(request, "dashboard.html", context)
+
+
+@login_required
+def dashboard_cache_stats(request):
+    return JsonResponse(cache_stats())
+
+
+@login_required
+def dashboard_series(request):
+    form = DashboardFilterForm(request.GET or None)
+    date_from, date_to = _dashboard_range(form)
+    bucket = request.GET.get("bucket") or "day"
+    if bucket not in BUCKETS:
+        return JsonResponse({"error": f"bucket must be one of: {', '.join(BUCKETS)}"}, status=400)
+    stats = order_stats(date_from, date_to, bucket=bucket)
+    return JsonResponse({
+        "bucket": bucket,
+        "date_from": date_from,
+        "date_to": date_to,
+        "totals": stats["totals"],
+        "series": stats["series"],
+    })
+
+
 @login_required
 def dashboard_export(request):
     form = DashboardFilterForm(request.GET or None)
-    qs = Order.objects.all()
-    date_from = None
-    date_to = None
-    if form.is_valid():
-        date_from = form.cleaned_data.get("date_from")
-        date_to = form.cleaned_data.get("date_to")
-        if date_from:
-            qs = qs.filter(date__gte=date_from)
-        if date_to:
-            qs = qs.filter(date__lte=date_to)
-
-    totals = qs.aggregate(
-        total_ingoing=Sum(Case(When(order_type=Order.INGOING, then=F("price")), output_field=BigIntegerField())),
-        total_outgoing=Sum(Case(When(order_type=Order.OUTGOING, then=F("price")), output_field=BigIntegerField())),
+    date_from, date_to = _dashboard_range(form)
+    response = StreamingHttpResponse(
+        iter_csv(dashboard_rows(date_from, date_to)),
+        content_type="text/csv; charset=utf-8",
     )
-    total_ingoing = totals.get("total_ingoing") or 0
-    total_outgoing = totals.get("total_outgoing") or 0
-    total_profit = total_ingoing - total_outgoing
+    response["Content-Disposition"] = "attachment; filename=dashboard_stats.csv"
+    return response
 
-    num_orders = qs.count()
-    num_ingoing = qs.filter(order_type=Order.INGOING).count()
-    num_outgoing = qs.filter(order_type=Order.OUTGOING).count()
-    from django.db.models import Q
-    num_neutral = qs.filter(Q(order_type__isnull=True) | Q(order_type='')).count()
 
-    response = HttpResponse(content_type="text/csv; charset=utf-8")
+@login_required
+async def dashboard_export_async(request):
+    """dashboard_export for ASGI, streamed from an async generator."""
+    form = DashboardFilterForm(request.GET or None)
+    date_from, date_to = _dashboard_range(form)
+    response = StreamingHttpResponse(
+        aiter_csv(adashboard_rows(date_from, date_to)),
+        content_type="text/csv; charset=utf-8",
+    )
     response["Content-Disposition"] = "attachment; filename=dashboard_stats.csv"
+    return response
 
-    writer = csv.writer(response)
-    # Summary section
-    writer.writerow(["Dashboard Statistics"])
-    writer.writerow(["Date From", date_from or "-"])
-    writer.writerow(["Date To", date_to or "-"])
-    writer.writerow(["Total Ingoing", total_ingoing])
-    writer.writerow(["Total Outgoing", total_outgoing])
-    writer.writerow(["Total Profit", total_profit])
-    writer.writerow(["Orders Count", num_orders])
-    writer.writerow(["Ingoing Count", num_ingoing])
-    writer.writerow(["Outgoing Count", num_outgoing])
-    writer.writerow(["Neutral Count", num_neutral])
-    writer.writerow([])
-
-    # Partner shares
-    writer.writerow(["Partner Shares (from profit)"])
-    writer.writerow(["Partner", "Percentage", "Share Amount"])
-    for partner in Partner.objects.all():
-        share = (Decimal(total_profit) * (partner.percentage or Decimal("0"))) / Decimal("100")
-        writer.writerow([partner.name, f"{partner.percentage}%", share])
-    writer.writerow([])
-
-    # Orders detail
-    writer.writerow(["Orders"])
-    writer.writerow(["Date", "Name", "Type", "Price", "Description"])
-    for order in qs.order_by("-date", "name"):
-        writer.writerow([order.date, order.name, order.get_order_type_display(), order.price, order.description])
 
-    return response
+@login_required
+@require_POST
+def dashboard_export_job(request):
+    """Queue the dashboard export for a run_jobs worker instead of streaming it from the request."""
+    form = DashboardFilterForm(request.POST)
+    date_from, date_to = _dashboard_range(form)
+    job = jobs.enqueue(jobs.DASHBOARD_EXPORT, {
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+    }, user=request.user)
+    return redirect(reverse("job_detail", args=[job.pk]))
+
+
+@login_required
+def job_detail(request, pk: int):
+    job = get_object_or_404(Job, pk=pk, user=request.user)
+    finished = job.status in (Job.DONE, Job.FAILED)
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "id": job.pk,
+            "kind": job.kind,
+            "status": job.status,
+            "progress": job.progress,
+            "total": job.total,
+            "percent": job.percent,
+            "download_url": reverse("job_download", args=[job.pk]) if job.status == Job.DONE else None,
+        })
+    return render(request, "jobs/detail.html", {"job": job, "finished": finished})
+
+
+@login_required
+def job_download(request, pk: int):
+    job = get_object_or_404(Job, pk=pk, user=request.user, status=Job.DONE)
+    try:
+        fh = open(job.result_path, "rb")
+    except OSError:
+        raise Http404("The file has expired.")
+    return FileResponse(fh, as_attachment=True, filename=job.result_name, content_type="text/csv; charset=utf-8")
+
+
+CUSTOMERS_SHOWN = 100
+FACET_MONTHS_SHOWN = 12
+
+
+def _querystring_without(request, *keys):
+    query_params = request.GET.copy()
+    for key in keys:
+        query_params.pop(key, None)
+    return ("?" + urlencode(query_params, doseq=True)) if query_params else ""
+
+
+def _cached_facets(request, signature, compute):
+    """Facet counts cached per filter signature, keyed by the ORDERS version data_condition already read."""
+    return get_or_compute("order_facets", signature, (DataVersion.ORDERS,), compute, versions=request_versions(request, (DataVersion.ORDERS,)))
+
+
+def _with_params(request, **params):
+    query_params = request.GET.copy()
+    for key in ("cursor", "page"):
+        query_params.pop(key, None)
+    for key, value in params.items():
+        if value is None:
+            query_params.pop(key, None)
+        else:
+            query_params[key] = value
+    return "?" + urlencode(query_params, doseq=True)
+
+
+def _facet_links(request, facets):
+    """The month and price facets as links that narrow the current filters to that value."""
+    months = [
+        {"label": f"{start:%Y-%m}", "count": count,
+         "querystring": _with_params(request, date_from=start.isoformat(), date_to=end.isoformat())}
+        for start, end, count in facets["months"][:FACET_MONTHS_SHOWN]
+    ]
+    # The rollup has no prices: that facet is only shown once text or price filters narrow the list.
+    prices = facets["prices"] is not None and [
+        {"label": f"{low:,}+" if high is None else f"{low:,} - {high:,}", "count": count,
+         "querystring": _with_params(request, price_min=low, price_max=high)}
+        for low, high, count in facets["prices"] if count
+    ]
+    return {"months": months, "prices": prices, "total": facets["total"]}
 
 
 @login_required
+@data_condition(DataVersion.ORDERS)
 def orders_list(request):
-    qs = Order.objects.all()
     form = OrderFilterForm(request.GET or None)
 
+    # Archived orders are only read when asked for; the live list counts them from the frozen rollup rows.
+    archive = form.is_valid() and form.cleaned_data.get("archive")
+    base = ArchivedOrder.objects.all() if archive else Order.objects.all()
+    qs = base
+    sort_by = "-date"
+    counts = facets = None
     if form.is_valid():
-        search = form.cleaned_data.get("search")
-        customer_search = form.cleaned_data.get("customer_search")
-        order_type = form.cleaned_data.get("order_type")
-        date_from = form.cleaned_data.get("date_from")
-        date_to = form.cleaned_data.get("date_to")
-        price_min = form.cleaned_data.get("price_min")
-        price_max = form.cleaned_data.get("price_max")
-        sort_by = form.cleaned_data.get("sort_by") or "-date"
-
-        if search:
-            from django.db.models import Q
-            qs = qs.filter(Q(name__icontains=search) | Q(description__icontains=search))
-        if customer_search:
-            from django.db.models import Q
-            qs = qs.filter(Q(customer_name__icontains=customer_search) | Q(customer_address__icontains=customer_search))
-        if order_type:
-            qs = qs.filter(order_type=order_type)
-        if date_from:
-            qs = qs.filter(date__gte=date_from)
-        if date_to:
-            qs = qs.filter(date__lte=date_to)
-        if price_min is not None:
-            qs = qs.filter(price__gte=price_min)
-        if price_max is not None:
-            qs = qs.filter(price__lte=price_max)
-
-        qs = qs.order_by(sort_by)
+        qs = form.filter_queryset(base)
+        sort_by = form.ordering()
+        data = form.cleaned_data
+        dates = (data.get("date_from"), data.get("date_to"))
+        if form.only_date_and_type_filters():
+            counts = rollup_counts(*dates, data.get("order_type"))
+            facets = _cached_facets(request, form.filter_signature(), lambda: rollup_facets(*dates, data.get("order_type"), archive=archive))
+        else:
+            facets = _cached_facets(request, form.filter_signature(), lambda: order_facets(form.facet_queryset(base), data.get("order_type")))
+    elif not form.is_bound:
+        counts = rollup_counts()
+        facets = _cached_facets(request, {}, rollup_facets)
+    if facets is not None:
+        form.show_facets(facets)
+    if counts is not None:
+        total_count = counts["archived" if archive else "live"]
     else:
-        qs = qs.order_by("-date")
+        total_count = None if facets is None else facets["total"]
 
-    # Pagination
-    per_page_default = 10
-    try:
-        per_page = int((form.data.get("per_page") or form.cleaned_data.get("per_page") or per_page_default))
-    except Exception:
-        per_page = per_page_default
-    paginator = Paginator(qs, per_page)
-    page = request.GET.get("page") or 1
+    # Keyset pagination: every page costs the same as the first, and no COUNT(*) is run.
+    # Only the form's choices are used; anything else falls back to the default.
+    per_page = 10
+    if form.is_valid():
+        per_page = int(form.cleaned_data.get("per_page") or per_page)
     try:
-        orders_page = paginator.page(page)
-    except PageNotAnInteger:
-        orders_page = paginator.page(1)
-    except EmptyPage:
-        orders_page = paginator.page(paginator.num_pages)
-
-    # Build querystring without 'page' for pagination links
-    from urllib.parse import urlencode
-    query_params = request.GET.copy()
-    if "page" in query_params:
-        query_params.pop("page")
-    base_querystring = ("?" + urlencode(query_params, doseq=True)) if query_params else ""
+        orders_page = paginate_keyset(qs, sort_by, per_page, cursor=request.GET.get("cursor"))
+    except InvalidCursor:
+        orders_page = paginate_keyset(qs, sort_by, per_page)
+
+    # Build querystring without the cursor for pagination links
+    base_querystring = _querystring_without(request, "cursor", "page")
 
-    context = {"orders": orders_page, "filter_form": form, "base_querystring": base_querystring, "per_page": per_page}
+    context = {
+        "orders": orders_page,
+        "filter_form": form,
+        "base_querystring": base_querystring,
+        "per_page": per_page,
+        "total_count": total_count,
+        "archived_count": None if counts is None or archive else counts["archived"],
+        "archive": archive,
+        "archive_querystring": _querystring_without(request, "cursor", "page", "archive"),
+        "facets": facets and _facet_links(request, facets),
+        "bulk_form": OrderBulkActionForm(),
+    }
     return render(request, "orders/list.html", context)
 
 
+@login_required
+@data_condition(DataVersion.ORDERS)
+def customers_list(request):
+    form = CustomerFilterForm(request.GET or None)
+    data = form.cleaned_data if form.is_valid() else {}
+    rows = customer_totals(
+        data.get("date_from"),
+        data.get("date_to"),
+        search=data.get("search") or "",
+        sort=data.get("sort_by") or "-total_ingoing",
+        limit=CUSTOMERS_SHOWN,
+        archive=bool(data.get("archive")),
+    )
+    context = {
+        "filter_form": form,
+        "rows": rows,
+        "limit": CUSTOMERS_SHOWN,
+        "archive": bool(data.get("archive")),
+    }
+    return render(request, "customers/list.html", context)
+
+
 @login_required
 def order_create(request):
     if request.method == "POST":
@@ -215,6 +290,47 @@ def order_create(request):
     return render(request, "orders/form.html", {"form": form})
 
 
+@login_required
+def order_import(request):
+    result = None
+    if request.method == "POST":
+        form = OrderImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data["file"]
+            stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+            result = import_orders_logged(request, stream, source=upload.name)
+    else:
+        form = OrderImportForm()
+    return render(request, "orders/import.html", {"form": form, "result": result})
+
+
+@login_required
+@require_POST
+def order_bulk_action(request):
+    form = OrderBulkActionForm(request.POST)
+    next_url = request.POST.get("next")
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}, require_https=request.is_secure()):
+        next_url = reverse("orders_list")
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect(next_url)
+    ids = form.cleaned_data["ids"]
+    action = form.cleaned_data["action"]
+    if action == OrderBulkActionForm.DELETE:
+        bulk.bulk_delete(request, ids)
+    elif action == OrderBulkActionForm.SET_TYPE:
+        bulk.bulk_set_type(request, ids, form.cleaned_data.get("order_type"))
+    elif action == OrderBulkActionForm.SHIFT_DATE:
+        try:
+            bulk.bulk_shift_date(request, ids, form.cleaned_data["days"])
+        except ClosedYearError:
+            # Rolled back: the shift would have moved orders into an archived year.
+            messages.error(request, "لا يمكن نقل الطلبات إلى سنة مؤرشفة، لم يتم تغيير أي تاريخ")
+    return redirect(next_url)
+
+
 @login_required
 def order_edit(request, pk: int):
     order = get_object_or_404(Order, pk=pk)
@@ -240,15 +356,43 @@ def order_delete(request, pk: int):
 
 
 @login_required
+@data_condition(DataVersion.PARTNERS)
 def partners_list(request):
     partners = Partner.objects.all()
     return render(request, "partners/list.html", {"partners": partners})
 
 
 @login_required
+@data_condition(DataVersion.ORDERS, DataVersion.PARTNERS)
+def partners_statement(request):
+    form = PartnerStatementForm(request.GET or {"year": timezone.localdate().year, "period": "month"})
+    statement = None
+    if form.is_valid():
+        periods = year_periods(form.cleaned_data["year"], form.cleaned_data.get("period") or "month")
+        statement = partner_statement(periods)
+    return render(request, "partners/statement.html", {"filter_form": form, "statement": statement})
+
+
+@login_required
+@data_condition(DataVersion.ACTIVITY)
 def logs_list(request):
-    logs = ActivityLog.objects.select_related("user").all()
-    return render(request, "logs/list.html", {"logs": logs})
+    logs = ActivityLog.objects.select_related("user")
+    form = ActivityLogFilterForm(request.GET or None)
+    per_page = 50
+    if form.is_valid():
+        logs = form.filter_queryset(logs)
+        per_page = int(form.cleaned_data.get("per_page") or per_page)
+    try:
+        logs_page = paginate_keyset(logs, "-timestamp", per_page, cursor=request.GET.get("cursor"))
+    except InvalidCursor:
+        logs_page = paginate_keyset(logs, "-timestamp", per_page)
+
+    context = {
+        "logs": logs_page,
+        "filter_form": form,
+        "base_querystring": _querystring_without(request, "cursor"),
+    }
+    return render(request, "logs/list.html", context)
 
 
 @login_required